@@ -26,6 +26,10 @@ PERMANENT_SESSION_LIFETIME = timedelta(days=7)
 APP_NAME = 'PC28助手平台'
 APP_VERSION = '0.2.0'
 
+# 静态资源配置
+ASSET_BUNDLING = True  # 启动时压缩、合并静态资源并以内容哈希命名（关闭时页面直接加载源文件，便于调试）
+ASSET_CACHE_MAX_AGE = 31536000  # 带内容哈希的静态资源缓存时间（秒）
+
 # 日志配置
 LOG_LEVEL = 'INFO'
 LOG_FILE = 'logs/app.log'
@@ -33,22 +37,55 @@ LOG_FILE = 'logs/app.log'
 # 分页配置
 ITEMS_PER_PAGE = 30
 MAX_PAGES = 5
+API_RESULTS_MAX_LIMIT = 100  # /api/lottery/results 每页最多返回的记录数
 
 # 开奖数据API配置
 API_BASE_URL = 'http://pc28.help'
 API_RESULT_DEFAULT_TYPE = 'jnd28'
 API_DEFAULT_TIMEOUT = 10
-API_ENDPOINT = '/kj.json?limit=100'  # 新的JSON API端点
+HTTP_POOL_SIZE = 4  # 上游API的HTTP连接池大小（保持长连接复用）
+API_ENDPOINT = '/kj.json'  # 新的JSON API端点
+API_LIMIT_CAUGHT_UP = 5  # 数据已追平时每次请求的条数
+API_LIMIT_MAX = 100  # 首次启动、停机恢复或发现断档时的请求条数
 
 # 遗漏查询API配置
 MISSING_API_URL = 'http://www.xyyc28.top/jnd/wkqsapi.php'
 MISSING_API_TIMEOUT = 10  # 遗漏查询API超时时间（秒）
+MISSING_API_CROSS_CHECK = False  # 是否在每期开奖后与遗漏查询API核对本地遗漏统计（仅记录日志）
+MISSING_CACHE_TTL = 60  # 遗漏统计缓存有效期（秒），最新期号变化时也会刷新
 
 # 数据更新配置
-DATA_UPDATE_INTERVAL = 1  # 数据更新间隔（秒）
-DATA_RETENTION_DAYS = 30   # 数据保留天数 
+LOTTERY_INTERVAL = 210  # 开奖间隔时间（秒）
+CACHE_DRAW_MARGIN_SECONDS = 10  # 开奖数据接口缓存提前于预计开奖时间过期的秒数
+DATA_UPDATE_INTERVAL = 1  # 开奖窗口内的数据更新间隔（秒）
+FETCH_LEAD_SECONDS = 3  # 在预计开奖时间前多少秒开始快速轮询
+FETCH_WINDOW_SECONDS = 30  # 预计开奖时间后继续快速轮询的秒数
+FETCH_BACKOFF_MAX_SECONDS = 30  # 开奖延迟时指数退避的最大请求间隔（秒）
+CADENCE_SAMPLE_SIZE = 20  # 估算开奖周期时采样的最近期数
+DATA_RETENTION_DAYS = 30   # 数据保留天数，更早的开奖记录移入压缩归档（lottery_archive）
 ENABLE_SCHEDULER = False  # 是否启用调度器（True=自动获取数据，False=手动刷新模式）
 
+# 开奖缓存配置
+RECENT_CACHE_SIZE = 3000  # 内存中缓存的最新开奖记录数
+RECENT_CACHE_SYNC_SECONDS = 2  # 缓存与数据库同步检查间隔（秒），用于发现其他进程写入的新记录
+RECORD_COUNT_RECONCILE_SECONDS = 60  # 开奖记录计数与数据库校准间隔（秒）
+
+# 新开奖推送（SSE）配置
+SSE_MAX_CLIENTS = 100  # 单进程最大推送连接数，超出后前端回退到轮询
+SSE_KEEPALIVE_SECONDS = 15  # 心跳间隔（秒）
+SSE_MAX_DURATION_SECONDS = 600  # 单个连接最长保持时间（秒），到期后浏览器自动重连
+
+# 后台维护任务配置
+MAINTENANCE_LOCK_TTL = 120  # 跨进程维护锁的有效期（秒），持有者每批处理后续期
+MIGRATION_BATCH_SIZE = 500  # 后台迁移（数字期号、形态等字段回填）每批更新的记录数
+MIGRATION_PAUSE_SECONDS = 0.1  # 后台迁移每批之间的间隔（秒），减小对数据库的压力
+ARCHIVE_CHECK_INTERVAL = 3600  # 检查并归档超过保留天数的开奖记录的间隔（秒）
+
+# 统计配置
+STATS_WINDOWS = [50, 100, 200, 500, 1000]  # 由统计引擎增量维护的统计期数窗口
+ANALYSIS_MAX_PERIODS = 100000  # 统计和号码分析接口允许的最大期数（超过1000期时读取历史文件）
+HISTORY_FILE = 'data/draw_history.bin'  # 全量开奖历史的定长二进制文件
+
 # PC28形态和类型判断配置
 # 基本形态判断规则（对子、顺子、豹子、杂六）
 PATTERN_TYPES = {
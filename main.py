@@ -1,9 +1,15 @@
-from flask import Flask, jsonify, render_template, request, session, redirect, url_for
+from flask import Flask, jsonify, render_template, request, session, redirect, url_for, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_pymongo import PyMongo
 import os
 import logging
 import math
 import re
+import time
+import threading
+import queue
+import hashlib
+import numpy as np
 from logging.handlers import RotatingFileHandler
 from datetime import datetime
 from markupsafe import Markup
@@ -14,10 +20,25 @@ from PIL import Image
 import config
 # 导入自定义工具
 from utils.api_client import LotteryApiClient
-from utils.db_manager import DBManager
+from utils.db_manager import DBManager, QihaoNumMigration, OpenTimeMigration
 from utils.scheduler import LotteryScheduler
-from utils.pattern_analyzer import analyze_lottery_result
 from utils.missing_analyzer import MissingAnalyzer
+from utils.event_stream import DrawEventBroker
+from utils.stats_engine import StatsEngine, count_entry
+from utils.omission_tracker import OmissionTracker
+from utils.daily_stats import DailyStatsStore
+from utils.maintenance import MaintenanceRunner, PatternBackfill
+from utils.archiver import ArchiveJob
+from utils.history_store import HistoryStore
+from utils.draw import Draw, PATTERN_ABSENT
+from utils.page_cache import PageCache
+from utils.json_cache import JsonResponseCache
+from utils.assets import AssetManifest
+from utils.draw_block import (
+    DrawBlock, MISSING, SIZE_BIG, SIZE_SMALL, PARITY_ODD, PARITY_EVEN,
+    PATTERN_MIXED, PATTERN_PAIR, PATTERN_STRAIGHT, PATTERN_LEOPARD,
+    count_codes, continuous_runs, ranked_counts
+)
 
 # HTML代码安全过滤函数
 def sanitize_html_code(html_code):
@@ -41,13 +62,28 @@ def sanitize_html_code(html_code):
     
     return cleaned_code.strip()
 
+class DrawJSONProvider(DefaultJSONProvider):
+    """JSON序列化时将Draw对象转换为与数据库文档一致的字典"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Draw):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 # 创建应用实例
 app = Flask(__name__)
 app.config.from_object(config)
+app.json = DrawJSONProvider(app)
 
 # 初始化MongoDB
 mongo = PyMongo(app)
 
+# 后台迁移：为历史记录补充数字期号、修正开奖时间年份并补充形态字段。在加载开奖数据之前创建以读取
+# 各迁移的完成标记，本进程或其他进程完成迁移后据此重新加载
+open_time_migration = OpenTimeMigration(mongo.db)
+maintenance = MaintenanceRunner([QihaoNumMigration(mongo.db), open_time_migration, PatternBackfill(mongo.db)])
+
 # 初始化数据库管理器
 db_manager = DBManager(mongo)
 
@@ -60,49 +96,106 @@ missing_analyzer = MissingAnalyzer()
 # 初始化调度器
 scheduler = LotteryScheduler(lottery_api, db_manager)
 
-# 初始化形态分析，为现有数据添加形态信息
-def initialize_pattern_analysis():
-    app.logger.info("开始初始化数据形态分析...")
+# 初始化新开奖推送
+draw_events = DrawEventBroker(config.SSE_MAX_CLIENTS)
+
+def format_draw_event(record):
+    """将开奖记录格式化为SSE消息"""
+    return f"event: draw\nid: {record.qihao or ''}\ndata: {app.json.dumps(record)}\n\n"
+
+def publish_new_draws(records):
+    """新开奖记录进入缓存时推送最新一期"""
+    if draw_events.subscriber_count():
+        draw_events.publish(format_draw_event(records[0]))
+
+db_manager.add_draw_listener(publish_new_draws)
+
+# 初始化滑动窗口统计引擎
+stats_engine = StatsEngine(config.STATS_WINDOWS)
+
+def load_stats_engine():
+    """使用最新开奖记录重建统计引擎"""
+    stats_engine.load(db_manager.get_latest_results(limit=stats_engine.max_window, profile='stats'))
+
+def update_stats_engine(records):
+    """新开奖记录进入缓存时增量更新统计引擎"""
+    if not stats_engine.add_draws(records):
+        load_stats_engine()
+
+db_manager.add_draw_listener(update_stats_engine)
+
+# 初始化本地遗漏统计
+omission_tracker = OmissionTracker()
+
+def load_omission_tracker():
+    """从最新一期向前回溯开奖记录重建遗漏统计"""
+    omission_tracker.load(db_manager.iter_latest_results(profile='stats'))
+
+def cross_check_missing_data():
+    """与遗漏查询API的结果核对，仅记录不一致的类型"""
+    remote_stats = missing_analyzer.get_missing_statistics(db_manager.get_high_water_mark())
+    mismatches = omission_tracker.compare(remote_stats)
+    if mismatches:
+        detail = ', '.join(f"{key}: 本地{local} 外部{remote}" for key, local, remote in mismatches)
+        app.logger.warning(f"遗漏统计与外部API不一致（外部数据可能尚未更新到最新一期）: {detail}")
+
+def update_omission_tracker(records):
+    """新开奖记录进入缓存时更新遗漏统计"""
+    if not omission_tracker.add_draws(records):
+        load_omission_tracker()
+    if config.MISSING_API_CROSS_CHECK:
+        threading.Thread(target=cross_check_missing_data, daemon=True).start()
+
+db_manager.add_draw_listener(update_omission_tracker)
+
+# 初始化按日统计
+daily_stats = DailyStatsStore(db_manager)
+db_manager.add_draw_listener(daily_stats.add_draws)
+
+# 初始化全量开奖历史文件，新开奖记录随入库追加
+history_store = HistoryStore(config.HISTORY_FILE)
+db_manager.add_draw_listener(history_store.append)
+
+# 初始化页面渲染缓存，新开奖入库时失效
+page_cache = PageCache(config.MAX_PAGES)
+db_manager.add_draw_listener(lambda records: page_cache.invalidate())
+
+# 初始化预序列化JSON响应缓存，新开奖入库时失效
+json_cache = JsonResponseCache(app.json.default)
+db_manager.add_draw_listener(lambda records: json_cache.invalidate())
+
+# 历史文件不可用时，从数据库读取的最大期数
+DB_ANALYSIS_MAX_PERIODS = 1000
+
+def sync_history_store():
+    """将数据库（含归档）中比历史文件更新的记录追加到历史文件，文件未覆盖全部历史时重建"""
     try:
-        # 获取所有没有pattern字段的记录
-        records = mongo.db.lottery_results.find({"pattern": {"$exists": False}})
-        count = 0
-        
-        for record in records:
-            if 'result' in record and 'number_sum' in record:
-                try:
-                    # 分析开奖结果形态
-                    number_sum = int(record['number_sum'])
-                    pattern_analysis = analyze_lottery_result(record['result'], number_sum)
-                    
-                    if pattern_analysis and 'basic' in pattern_analysis:
-                        # 更新记录，添加形态分析结果
-                        update_data = {
-                            "pattern": pattern_analysis['basic']['name'],
-                            "pattern_type": pattern_analysis['basic']['pattern']
-                        }
-                        
-                        # 添加极值和中边信息
-                        if pattern_analysis['extreme']:
-                            update_data['extreme'] = pattern_analysis['extreme']['name']
-                            update_data['extreme_type'] = pattern_analysis['extreme']['pattern']
-                        
-                        if pattern_analysis['position']:
-                            update_data['position'] = pattern_analysis['position']['name']
-                            update_data['position_type'] = pattern_analysis['position']['pattern']
-                        
-                        # 更新数据库
-                        mongo.db.lottery_results.update_one(
-                            {"_id": record["_id"]},
-                            {"$set": update_data}
-                        )
-                        count += 1
-                except Exception as e:
-                    app.logger.error(f"分析记录形态失败 (期号: {record.get('qihao', '未知')}): {e}")
-        
-        app.logger.info(f"形态分析初始化完成，更新了 {count} 条记录")
+        first_qihao_num, count = db_manager.get_history_range()
+        history_store.sync(lambda: db_manager.iter_latest_results(profile='analysis'), first_qihao_num, count)
     except Exception as e:
-        app.logger.error(f"形态分析初始化失败: {e}")
+        app.logger.error(f"同步开奖历史文件失败: {e}")
+
+def reload_after_maintenance(changed):
+    """
+    后台迁移结束后（在迁移线程中）同步历史文件；迁移更新了历史记录时先重新加载开奖缓存和统计，
+    并清除已缓存的响应
+
+    Args:
+        changed: 迁移完成标记是否发生变化
+    """
+    if changed:
+        db_manager.warm_recent_cache()
+        load_stats_engine()
+        load_omission_tracker()
+        daily_stats.load_today()
+        daily_stats.invalidate_closed_days()
+        page_cache.invalidate()
+        json_cache.invalidate()
+    # 历史文件需要完整的数字期号，在迁移结束后才能同步；同步完成前分析接口从数据库读取
+    sync_history_store()
+
+# 历史数据归档：超过保留天数的开奖记录定期移入压缩归档
+archive_job = ArchiveJob(db_manager, depends_on=[open_time_migration])
 
 # 确保日志目录存在
 if not os.path.exists('logs'):
@@ -130,8 +223,14 @@ if config.ENABLE_SCHEDULER:
 else:
     app.logger.info("调度器已禁用，使用手动刷新模式")
 
-# 初始化形态分析
-initialize_pattern_analysis()
+# 加载统计引擎和遗漏统计（后台迁移完成后会重新加载）
+load_stats_engine()
+load_omission_tracker()
+daily_stats.load_today()
+
+# 在后台启动迁移和数据归档，不阻塞应用启动
+maintenance.start(on_complete=reload_after_maintenance)
+archive_job.start()
 
 # 添加自定义模板过滤器
 @app.template_filter('safe_html')
@@ -145,17 +244,119 @@ def safe_html_filter(html_code):
     cleaned_code = sanitize_html_code(html_code)
     return Markup(cleaned_code)
 
+# 构建静态资源，url_for输出带内容哈希的文件名
+assets = AssetManifest(app.static_folder)
+if config.ASSET_BUNDLING:
+    assets.build()
+
+@app.url_defaults
+def hashed_static_url(endpoint, values):
+    """url_for('static', filename=...) 替换为构建后的文件"""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = assets.resolve(values['filename'])
+
+@app.context_processor
+def inject_asset_urls():
+    """模板中通过asset_urls(包名)获取资源包需要引用的地址"""
+    def asset_urls(name):
+        return [url_for('static', filename=filename) for filename in assets.bundle_files(name)]
+    return {'asset_urls': asset_urls}
+
+@app.after_request
+def cache_built_assets(response):
+    """构建目录中的文件名包含内容哈希，允许浏览器长期缓存"""
+    if request.endpoint == 'static' and response.status_code in (200, 304):
+        if assets.is_built_file((request.view_args or {}).get('filename', '')):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = config.ASSET_CACHE_MAX_AGE
+            response.cache_control.immutable = True
+    return response
+
 # 自定义过滤器：获取当前年份
 @app.template_filter('now')
 def filter_now(format_string):
     return datetime.now().strftime(format_string)
 
+# 估算距离下一期开奖的秒数
+def seconds_until_next_draw(latest):
+    """根据最新一期开奖时间估算距下一期开奖的秒数，无法估算时返回0"""
+    opentime_dt = latest.opentime_dt if latest else None
+    if opentime_dt is None:
+        return 0
+    remaining = (opentime_dt - datetime.now()).total_seconds() + config.LOTTERY_INTERVAL
+    # 超出一个开奖间隔说明时间数据异常，不允许缓存
+    if remaining > config.LOTTERY_INTERVAL:
+        return 0
+    return max(0, int(remaining) - config.CACHE_DRAW_MARGIN_SECONDS)
+
+def encoded_json_response(entry):
+    """按请求的Accept-Encoding返回预序列化的JSON响应"""
+    body, encoding = entry.select(request.accept_encodings)
+    response = Response(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def cached_json_response(key, payload):
+    """序列化并缓存响应数据后返回，缓存已满时按普通响应返回"""
+    entry = json_cache.put(key, payload)
+    return encoded_json_response(entry) if entry is not None else jsonify(payload)
+
+# 响应编码对应的ETag后缀，同一数据的不同编码使用不同的ETag
+ETAG_ENCODING_SUFFIXES = {None: '', 'gzip': '-gz', 'br': '-br'}
+
+# 按最新期号生成可缓存的JSON响应
+def draw_cached_json(latest, build_payload, cache_key=None):
+    """
+    生成带ETag和Cache-Control的开奖数据响应
+    
+    ETag由最新期号和查询参数决定，压缩后的响应在ETag后追加编码后缀，
+    使不同编码的响应体拥有不同的ETag；客户端携带任一编码的ETag时直接返回304，
+    max-age在预计的下一期开奖时间到期。
+    
+    Args:
+        latest: 最新一期开奖记录
+        build_payload: 生成响应数据的函数，仅在需要返回完整内容时调用
+        cache_key: 预序列化响应的缓存键（只用于固定的热点请求），为None时每次直接序列化
+    """
+    etag_source = '|'.join([str(latest.qihao or '' if latest else '')] +
+                           [f"{k}={v}" for k, v in sorted(request.args.items())])
+    etag = hashlib.md5(etag_source.encode('utf-8')).hexdigest()
+    matched = next((etag + suffix for suffix in ETAG_ENCODING_SUFFIXES.values()
+                    if request.if_none_match.contains(etag + suffix)), None)
+    
+    if matched is not None:
+        response = Response(status=304)
+        response.vary.add('Accept-Encoding')
+        response.set_etag(matched)
+    else:
+        if cache_key is not None and latest:
+            key = (cache_key, latest.qihao)
+            entry = json_cache.get(key)
+            response = encoded_json_response(entry) if entry is not None else cached_json_response(key, build_payload())
+        else:
+            response = jsonify(build_payload())
+        response.set_etag(etag + ETAG_ENCODING_SUFFIXES[response.headers.get('Content-Encoding')])
+    response.cache_control.public = True
+    response.cache_control.max_age = seconds_until_next_draw(latest)
+    return response
+
+def cached_page(route, page, render):
+    """按最新期号从页面缓存读取渲染结果，缓存不存在时调用render渲染"""
+    latest = db_manager.get_latest_result()
+    return page_cache.get_or_render(route, page, latest.qihao if latest else None, render)
+
 # 根路由 - 显示开奖信息
 @app.route('/')
 def home():
     # 获取页码参数
     page = request.args.get('page', 1, type=int)
-    
+    return cached_page('home', page, lambda: render_home(page))
+
+def render_home(page):
+    """渲染首页"""
     # 每页显示条数
     per_page = 30
     
@@ -200,54 +401,105 @@ def home():
         total_pages=total_pages,
         total_records=total_count,
         scheduler_status=scheduler_status,
-        lottery_interval=210  # 开奖间隔时间（秒）
+        lottery_interval=config.LOTTERY_INTERVAL  # 开奖间隔时间（秒）
     )
 
 # API路由 - 获取开奖数据
 @app.route('/api/lottery/results')
 def api_lottery_results():
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 30, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', config.ITEMS_PER_PAGE, type=int), 1), config.API_RESULTS_MAX_LIMIT)
     is_history = request.args.get('history', '0') == '1'
     
     # 计算跳过记录数
     skip = (page - 1) * limit
     
-    # 从数据库获取数据
-    results = db_manager.get_latest_results(limit=limit, skip=skip)
-    total_count = db_manager.count_lottery_results()
-    total_pages = math.ceil(total_count / limit)
+    # 获取最新结果（同时用于生成ETag）
+    latest_result = db_manager.get_latest_result()
     
-    # 获取最新结果
-    latest = None
-    if not is_history and page == 1:
-        latest = db_manager.get_latest_result()
+    def build_payload():
+        # 从数据库获取数据
+        results = db_manager.get_latest_results(limit=limit, skip=skip)
+        total_count = db_manager.count_lottery_results()
+        total_pages = math.ceil(total_count / limit)
+        
+        latest = None
+        if not is_history and page == 1:
+            latest = latest_result
+        
+        return {
+            'status': 'success',
+            'data': results,
+            'latest': latest,
+            'page': page,
+            'count': len(results),
+            'total_records': total_count,
+            'total_pages': min(total_pages, 5)  # 最大5页
+        }
     
-    return jsonify({
-        'status': 'success',
-        'data': results,
-        'latest': latest,
-        'page': page,
-        'count': len(results),
-        'total_records': total_count,
-        'total_pages': min(total_pages, 5)  # 最大5页
-    })
+    # 只缓存默认每页条数的前几页
+    cache_key = None
+    if limit == config.ITEMS_PER_PAGE and page <= config.MAX_PAGES:
+        cache_key = ('results', page, is_history)
+    return draw_cached_json(latest_result, build_payload, cache_key)
 
 # API路由 - 获取最新开奖结果
 @app.route('/api/lottery/latest')
 def api_latest_result():
     latest = db_manager.get_latest_result()
     if latest:
-        return jsonify({
+        return draw_cached_json(latest, lambda: {
             'status': 'success',
             'data': latest
-        })
+        }, cache_key=('latest',))
     else:
         return jsonify({
             'status': 'error',
             'message': '无法获取最新开奖数据'
         }), 404
 
+# API路由 - 新开奖推送（Server-Sent Events）
+@app.route('/api/lottery/stream')
+def api_lottery_stream():
+    subscription = draw_events.subscribe()
+    if subscription is None:
+        # 连接数已满，前端收到错误后回退到轮询
+        return jsonify({
+            'status': 'error',
+            'message': '推送连接数已满'
+        }), 503
+    
+    def generate():
+        try:
+            # 连接建立时先推送当前最新一期，客户端据此判断是否错过了开奖
+            latest = db_manager.get_latest_result()
+            if latest:
+                yield format_draw_event(latest)
+            
+            started_at = time.monotonic()
+            last_keepalive = started_at
+            # 连接达到最长时长后关闭，由浏览器自动重连
+            while time.monotonic() - started_at < config.SSE_MAX_DURATION_SECONDS:
+                try:
+                    yield subscription.get(timeout=config.RECENT_CACHE_SYNC_SECONDS)
+                except queue.Empty:
+                    # 检查其他进程写入的新数据，有新数据时会通过订阅推送
+                    db_manager.sync_recent_cache()
+                    if time.monotonic() - last_keepalive >= config.SSE_KEEPALIVE_SECONDS:
+                        last_keepalive = time.monotonic()
+                        yield ': keepalive\n\n'
+        finally:
+            draw_events.unsubscribe(subscription)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 # API路由 - 手动刷新数据
 @app.route('/api/refresh')
 def api_refresh():
@@ -278,13 +530,22 @@ def api_status():
         'status': 'online',
         'app_name': config.APP_NAME,
         'version': config.APP_VERSION,
-        'scheduler': scheduler_status
+        'scheduler': scheduler_status,
+        'missing_cache': missing_analyzer.get_cache_stats(),
+        'maintenance': maintenance.get_status(),
+        'archive': archive_job.get_status(),
+        'page_cache': page_cache.get_stats(),
+        'json_cache': json_cache.get_stats()
     })
 
 # 添加历史记录路由
 @app.route('/history')
 def history():
     page = request.args.get('page', 1, type=int)
+    return cached_page('history', page, lambda: render_history(page))
+
+def render_history(page):
+    """渲染历史记录页"""
     per_page = 30
     skip = (page - 1) * per_page
     
@@ -310,42 +571,60 @@ def history():
         is_history_page=True  # 添加标记以区分历史页面
     )
 
+def get_remote_missing_statistics():
+    """从遗漏查询API获取遗漏统计，并根据本地开奖记录补充杂六遗漏"""
+    # 外部数据按最新期号缓存，同一期内的请求不重复访问外部API
+    missing_stats = missing_analyzer.get_missing_statistics(db_manager.get_high_water_mark())
+    if not missing_stats:
+        return None
+    
+    # 计算杂六的遗漏期数
+    try:
+        # 查询最近100条记录，找到最后一次出现杂六的记录
+        recent_results = db_manager.get_latest_results(limit=100, profile='stats')
+        
+        # 初始化杂六遗漏期数
+        mixed_missing_count = 0
+        
+        # 遍历所有记录，直到找到一个杂六
+        for result in recent_results:
+            if result.pattern_code in (PATTERN_MIXED, PATTERN_ABSENT):
+                break
+            mixed_missing_count += 1
+        
+        # 添加杂六遗漏到返回数据中
+        missing_stats['pattern']['zl'] = mixed_missing_count
+        
+        app.logger.info(f"杂六遗漏期数计算结果: {mixed_missing_count}")
+    except Exception as e:
+        app.logger.error(f"计算杂六遗漏期数失败: {e}")
+        # 如果计算失败，设置为0
+        missing_stats['pattern']['zl'] = 0
+    
+    return missing_stats
+
 # API路由 - 获取遗漏数据
 @app.route('/api/missing')
 def api_missing_data():
     """获取遗漏查询数据"""
     try:
-        # 从API获取遗漏统计数据
-        missing_stats = missing_analyzer.get_missing_statistics()
+        # 遗漏统计由本地开奖历史维护，序列化后的响应在同一期内复用
+        cache_key = ('missing', omission_tracker.head_qihao_num)
+        if omission_tracker.is_loaded:
+            entry = json_cache.get(cache_key)
+            if entry is not None:
+                return encoded_json_response(entry)
+        
+        missing_stats = omission_tracker.get_statistics()
+        if missing_stats is not None:
+            return cached_json_response(cache_key, {
+                'status': 'success',
+                'data': missing_stats
+            })
         
+        # 本地统计未加载时请求外部API
+        missing_stats = get_remote_missing_statistics()
         if missing_stats:
-            # 计算杂六的遗漏期数
-            try:
-                # 查询最近100条记录，找到最后一次出现杂六的记录
-                recent_results = db_manager.get_latest_results(limit=100)
-                
-                # 初始化杂六遗漏期数
-                mixed_missing_count = 0
-                
-                # 遍历所有记录，直到找到一个杂六
-                for result in recent_results:
-                    if result.get('pattern') is None or result.get('pattern') == '杂六':
-                        break
-                    mixed_missing_count += 1
-                
-                # 如果所有记录都不是杂六，设置为所有记录的长度
-                if mixed_missing_count >= len(recent_results):
-                    mixed_missing_count = len(recent_results)
-                
-                # 添加杂六遗漏到返回数据中
-                missing_stats['pattern']['zl'] = mixed_missing_count
-                
-                app.logger.info(f"杂六遗漏期数计算结果: {mixed_missing_count}")
-            except Exception as e:
-                app.logger.error(f"计算杂六遗漏期数失败: {e}")
-                # 如果计算失败，设置为0
-                missing_stats['pattern']['zl'] = 0
-            
             return jsonify({
                 'status': 'success',
                 'data': missing_stats
@@ -372,54 +651,70 @@ def api_stats_data():
     
     try:
         # 确保期数在合理范围内
-        if period < 50:
-            period = 50
-        elif period > 1000:
-            period = 1000
-        
-        # 定义获取数据的变量
-        lottery_data = []
+        period = clamp_analysis_periods(period)
         
-        # 根据是否提供日期参数选择数据获取方式
+        # 提供日期参数时按日统计
         if date_param:
             try:
-                # 解析日期参数
-                selected_date = datetime.strptime(date_param, "%Y-%m-%d")
-                
-                # 计算日期范围（当天00:00:00到23:59:59）
-                start_date = selected_date.replace(hour=0, minute=0, second=0).strftime("%Y-%m-%d %H:%M:%S")
-                end_date = selected_date.replace(hour=23, minute=59, second=59).strftime("%Y-%m-%d %H:%M:%S")
-                
-                # 使用日期范围查询
-                lottery_data = db_manager.get_results_by_date_range(start_date, end_date)
-                app.logger.info(f"统计功能: 按日期查询数据: {date_param}, 获取到 {len(lottery_data)} 条记录, 起止时间: {start_date} 至 {end_date}")
+                # 校验日期参数
+                datetime.strptime(date_param, "%Y-%m-%d")
             except ValueError:
                 app.logger.error(f"无效的日期格式: {date_param}")
                 return jsonify({
                     'status': 'error',
                     'message': '无效的日期格式'
                 }), 400
-        else:
-            # 直接获取最新的N条记录
-            lottery_data = list(mongo.db.lottery_results.find().sort('qihao', -1).limit(period))
-            app.logger.info(f"统计功能: 按期数查询数据: {period}, 获取到 {len(lottery_data)} 条记录")
+            
+            # 按日统计读取预聚合结果（当天为内存中的增量统计）
+            stats = daily_stats.get_day_stats(date_param)
+            app.logger.info(f"统计功能: 按日期查询数据: {date_param}, 统计期数: {stats['total_periods']}")
+            if not stats['total_periods']:
+                return jsonify({
+                    'status': 'error',
+                    'message': '无法获取开奖数据'
+                })
+            
+            stats['date'] = date_param
+            return jsonify({
+                'status': 'success',
+                'data': stats
+            })
         
-        if not lottery_data:
+        # 固定窗口期数直接读取统计引擎的增量结果，序列化后的响应在同一期内复用
+        today = datetime.now().strftime('%Y-%m-%d')
+        cache_key = ('stats', period, stats_engine.head_qihao_num, today)
+        if period in config.STATS_WINDOWS and stats_engine.is_loaded:
+            entry = json_cache.get(cache_key)
+            if entry is not None:
+                return encoded_json_response(entry)
+        
+        stats = stats_engine.get_stats(period)
+        if stats and stats['total_periods']:
+            stats['date'] = today
+            return cached_json_response(cache_key, {
+                'status': 'success',
+                'data': stats
+            })
+        
+        # 其他期数在历史文件的最新N期上计算
+        block = get_analysis_block(period)
+        
+        if block is None or not len(block):
             return jsonify({
                 'status': 'error',
                 'message': '无法获取开奖数据'
             })
         
         # 统计结果
-        basic_types = calculate_basic_stats(lottery_data)
-        combination_types = calculate_combo_stats(lottery_data)
-        sum_stats = calculate_sum_stats(lottery_data)
-        pattern_types = calculate_pattern_stats(lottery_data)
-        position_types = calculate_position_stats(lottery_data)
-        continuous_stats = calculate_continuous_stats(lottery_data)
+        basic_types = calculate_basic_stats(block)
+        combination_types = calculate_combo_stats(block)
+        sum_stats = calculate_sum_stats(block)
+        pattern_types = calculate_pattern_stats(block)
+        position_types = calculate_position_stats(block)
+        continuous_stats = calculate_continuous_stats(block)
         
         # 构建标准化的数据结构
-        actual_periods = len(lottery_data)
+        actual_periods = len(block)
         app.logger.info(f"统计功能: 实际统计期数: {actual_periods}, 日期参数: {date_param}")
         
         stats = {
@@ -430,7 +725,7 @@ def api_stats_data():
             'extreme_types': position_types,
             'continuous_stats': continuous_stats,
             'total_periods': actual_periods,  # 使用实际获取的数据长度作为总期数
-            'date': date_param or datetime.now().strftime('%Y-%m-%d')
+            'date': datetime.now().strftime('%Y-%m-%d')
         }
         
         # 最后更新时间显示已移除
@@ -449,6 +744,103 @@ def api_stats_data():
             'message': f'获取统计数据失败: {str(e)}'
         }), 500
 
+# 号码分析中"出号后组合"的编码与名称：0-3为大小单双组合，缺少单双时按大小记录
+AFTER_COMBO_NAMES = {
+    SIZE_BIG * 2 + PARITY_ODD: '大单',
+    SIZE_BIG * 2 + PARITY_EVEN: '大双',
+    SIZE_SMALL * 2 + PARITY_ODD: '小单',
+    SIZE_SMALL * 2 + PARITY_EVEN: '小双',
+    4 + SIZE_BIG: '大',
+    4 + SIZE_SMALL: '小'
+}
+
+def after_combo_codes(block, positions):
+    """获取指定位置开奖记录的组合编码"""
+    combos = block.combo_codes()[positions]
+    sizes = block.size[positions]
+    return np.where(combos != MISSING, combos, np.where(sizes != MISSING, 4 + sizes, MISSING))
+
+# 号码分析：在列式数据上计算单个和值的出现规律
+def analyze_number(block, number_int):
+    """
+    计算单个和值的号码分析结果（不含number字段）
+    
+    Args:
+        block: 按最新到最旧排列的DrawBlock
+        number_int: 和值
+    """
+    total_count = len(block)
+    
+    # 分析号码出现情况（位置按最新到最旧排列）
+    positions = np.flatnonzero(block.sums == number_int)
+    occurrence_count = len(positions)
+    
+    # 计算平均出现次数和间隔
+    avg_times = round(occurrence_count / (total_count / 100), 2) if total_count > 0 else 0
+    avg_interval = round(total_count / occurrence_count) if occurrence_count > 0 else total_count
+    
+    # 计算未开期数
+    not_opened_periods = int(positions[0]) if occurrence_count > 0 else total_count
+    
+    # 计算最小和最大间隔
+    intervals = np.diff(positions)
+    min_interval = int(intervals.min()) if len(intervals) else 0
+    max_interval = int(intervals.max()) if len(intervals) else 0
+    
+    # 获取出号前后的相关号码（出号前为更早一期，出号后为更晚一期）
+    before_sums = block.sums[positions[positions < total_count - 1] + 1]
+    after_positions = positions[positions > 0] - 1
+    after_sums = block.sums[after_positions]
+    before_sums = before_sums[before_sums != MISSING]
+    after_combos = after_combo_codes(block, after_positions)
+    valid_after_sums = after_sums[after_sums != MISSING]
+    
+    # 转换为按次数排序的列表格式（次数相同时按首次出现顺序）
+    before_numbers_list = [{'number': f"{v:02d}", 'count': c} for v, c in ranked_counts(before_sums)]
+    after_numbers_list = [{'number': f"{v:02d}", 'count': c} for v, c in ranked_counts(valid_after_sums)]
+    after_tails_list = [{'tail': str(v), 'count': c} for v, c in ranked_counts(valid_after_sums % 10)]
+    after_combos_list = [
+        {'combo': AFTER_COMBO_NAMES[v], 'count': c}
+        for v, c in ranked_counts(after_combos[after_combos != MISSING])
+    ]
+    
+    # 限制结果数量
+    max_items = 10
+    before_numbers_list = before_numbers_list[:max_items]
+    after_numbers_list = after_numbers_list[:max_items]
+    after_tails_list = after_tails_list[:max_items]
+    after_combos_list = after_combos_list[:max_items]
+    
+    return {
+        'total_periods': total_count,
+        'occurrence_count': occurrence_count,
+        'avg_times': avg_times,
+        'avg_interval': avg_interval,
+        'not_opened_periods': not_opened_periods,
+        'min_interval': min_interval,
+        'max_interval': max_interval,
+        'before_numbers': before_numbers_list,
+        'after_numbers': after_numbers_list,
+        'after_tails': after_tails_list,
+        'after_combos': after_combos_list
+    }
+
+# 限制号码分析期数在合理范围内
+def clamp_analysis_periods(periods):
+    if periods < 50:
+        return 50
+    if periods > config.ANALYSIS_MAX_PERIODS:
+        return config.ANALYSIS_MAX_PERIODS
+    return periods
+
+# 获取最新N期的列式数据：优先映射历史文件，历史文件尚未同步完成或不可用时从数据库读取
+def get_analysis_block(periods):
+    block = history_store.latest_block(periods) if history_store.is_complete else None
+    if block is not None:
+        return block
+    lottery_data = db_manager.get_latest_results(limit=min(periods, DB_ANALYSIS_MAX_PERIODS), profile='analysis')
+    return DrawBlock.from_records(lottery_data) if lottery_data else None
+
 # API路由 - 分析按钮相关的号码分析功能（单个号码的出现规律、间隔分析）
 @app.route('/api/number_analysis')
 def api_number_analysis():
@@ -469,426 +861,145 @@ def api_number_analysis():
         number_int = int(number)
         
         # 确保期数在合理范围内
-        if periods < 50:
-            periods = 50
-        elif periods > 1000:
-            periods = 1000
-        
-        # 获取开奖数据
-        lottery_data = list(mongo.db.lottery_results.find().sort('qihao', -1).limit(periods))
-        
-        if not lottery_data:
-            return jsonify({
-                'success': False,
-                'message': '无法获取开奖数据'
-            })
+        periods = clamp_analysis_periods(periods)
         
-        # 统计结果
-        total_count = len(lottery_data)
+        # 固定窗口期数直接读取统计引擎维护的转移表
+        analysis_result = stats_engine.get_number_analysis(periods, number_int)
         
-        # 分析号码出现情况
-        occurrences = []
-        for i, record in enumerate(lottery_data):
-            if 'number_sum' in record and int(record['number_sum']) == number_int:
-                occurrences.append({
-                    'index': i,
-                    'qihao': record['qihao'],
-                    'result': record,
-                    'position': i
+        if analysis_result is None:
+            # 获取开奖数据
+            block = get_analysis_block(periods)
+            
+            if block is None or not len(block):
+                return jsonify({
+                    'success': False,
+                    'message': '无法获取开奖数据'
                 })
+            
+            analysis_result = analyze_number(block, number_int)
         
-        occurrence_count = len(occurrences)
-        
-        # 计算平均出现次数和间隔
-        avg_times = round(occurrence_count / (total_count / 100), 2) if total_count > 0 else 0
-        avg_interval = round(total_count / occurrence_count) if occurrence_count > 0 else total_count
-        
-        # 计算未开期数
-        not_opened_periods = occurrences[0]['position'] if occurrence_count > 0 else total_count
-        
-        # 计算最小和最大间隔
-        intervals = []
-        for i in range(1, len(occurrences)):
-            # 使用绝对值确保间隔为正数
-            interval = abs(occurrences[i-1]['position'] - occurrences[i]['position'])
-            intervals.append(interval)
+        analysis_result['number'] = number
         
-        min_interval = min(intervals) if intervals else 0
-        max_interval = max(intervals) if intervals else 0
+        return jsonify({
+            'success': True,
+            'data': analysis_result
+        })
         
-        # 获取出号前后的相关号码
-        before_numbers = {}
-        after_numbers = {}
-        after_tails = {}
-        after_combos = {}
+    except Exception as e:
+        app.logger.error(f"获取号码分析数据失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'获取号码分析数据失败: {str(e)}'
+        }), 500
+
+# API路由 - 一次获取全部28个和值的号码分析
+@app.route('/api/number_analysis/all')
+def api_number_analysis_all():
+    periods = clamp_analysis_periods(request.args.get('periods', default=200, type=int))
+    
+    try:
+        results = stats_engine.get_all_number_analysis(periods)
         
-        for i, occ in enumerate(occurrences):
-            current_pos = occ['position']
+        if results is None:
+            block = get_analysis_block(periods)
             
-            # 收集出号前的号码
-            if current_pos < len(lottery_data) - 1:
-                before_rec = lottery_data[current_pos + 1]
-                before_num = str(before_rec['number_sum']).zfill(2)
-                
-                if before_num in before_numbers:
-                    before_numbers[before_num] += 1
-                else:
-                    before_numbers[before_num] = 1
+            if block is None or not len(block):
+                return jsonify({
+                    'success': False,
+                    'message': '无法获取开奖数据'
+                })
             
-            # 收集出号后的号码
-            if current_pos > 0:
-                after_rec = lottery_data[current_pos - 1]
-                after_num = str(after_rec['number_sum']).zfill(2)
-                
-                # 记录完整号码
-                if after_num in after_numbers:
-                    after_numbers[after_num] += 1
-                else:
-                    after_numbers[after_num] = 1
-                
-                # 记录尾数
-                tail = after_num[-1]
-                if tail in after_tails:
-                    after_tails[tail] += 1
-                else:
-                    after_tails[tail] = 1
-                
-                # 记录组合
-                combo = ''
-                if 'size' in after_rec and 'odd_even' in after_rec:
-                    if after_rec['size'] == '大' and after_rec['odd_even'] == '单':
-                        combo = '大单'
-                    elif after_rec['size'] == '大' and after_rec['odd_even'] == '双':
-                        combo = '大双'
-                    elif after_rec['size'] == '小' and after_rec['odd_even'] == '单':
-                        combo = '小单'
-                    elif after_rec['size'] == '小' and after_rec['odd_even'] == '双':
-                        combo = '小双'
-                    elif after_rec['size'] == '大':
-                        combo = '大'
-                    elif after_rec['size'] == '小':
-                        combo = '小'
-                
-                if combo:
-                    if combo in after_combos:
-                        after_combos[combo] += 1
-                    else:
-                        after_combos[combo] = 1
-        
-        # 转换为排序后的列表格式
-        before_numbers_list = [{'number': k, 'count': v} for k, v in before_numbers.items()]
-        before_numbers_list.sort(key=lambda x: x['count'], reverse=True)
-        
-        after_numbers_list = [{'number': k, 'count': v} for k, v in after_numbers.items()]
-        after_numbers_list.sort(key=lambda x: x['count'], reverse=True)
-        
-        after_tails_list = [{'tail': k, 'count': v} for k, v in after_tails.items()]
-        after_tails_list.sort(key=lambda x: x['count'], reverse=True)
-        
-        after_combos_list = [{'combo': k, 'count': v} for k, v in after_combos.items()]
-        after_combos_list.sort(key=lambda x: x['count'], reverse=True)
-        
-        # 限制结果数量
-        max_items = 10
-        before_numbers_list = before_numbers_list[:max_items]
-        after_numbers_list = after_numbers_list[:max_items]
-        after_tails_list = after_tails_list[:max_items]
-        after_combos_list = after_combos_list[:max_items]
-        
-        analysis_result = {
-            'number': number,
-            'total_periods': total_count,
-            'occurrence_count': occurrence_count,
-            'avg_times': avg_times,
-            'avg_interval': avg_interval,
-            'not_opened_periods': not_opened_periods,
-            'min_interval': min_interval,
-            'max_interval': max_interval,
-            'before_numbers': before_numbers_list,
-            'after_numbers': after_numbers_list,
-            'after_tails': after_tails_list,
-            'after_combos': after_combos_list
-            # 最后更新时间显示已移除
-        }
+            results = []
+            for number_int in range(28):
+                analysis_result = analyze_number(block, number_int)
+                analysis_result['number'] = f"{number_int:02d}"
+                results.append(analysis_result)
         
         return jsonify({
             'success': True,
-            'data': analysis_result
+            'data': results
         })
         
     except Exception as e:
-        app.logger.error(f"获取号码分析数据失败: {e}")
+        app.logger.error(f"获取全部号码分析数据失败: {e}")
         return jsonify({
             'success': False,
             'message': f'获取号码分析数据失败: {str(e)}'
         }), 500
 
 # 计算基本统计信息
-def calculate_basic_stats(lottery_data):
-    big_count = 0
-    small_count = 0
-    odd_count = 0
-    even_count = 0
-    total_count = len(lottery_data)
-    
-    for record in lottery_data:
-        if 'size' in record and record['size'] == '大':
-            big_count += 1
-        elif 'size' in record and record['size'] == '小':
-            small_count += 1
-            
-        if 'odd_even' in record and record['odd_even'] == '单':
-            odd_count += 1
-        elif 'odd_even' in record and record['odd_even'] == '双':
-            even_count += 1
+def calculate_basic_stats(block):
+    total_count = len(block)
+    size_counts = count_codes(block.size, 2)
+    parity_counts = count_codes(block.parity, 2)
     
     return {
-        'big': {
-            'count': big_count,
-            'percentage': round(big_count / total_count * 100, 1) if total_count > 0 else 0
-        },
-        'small': {
-            'count': small_count,
-            'percentage': round(small_count / total_count * 100, 1) if total_count > 0 else 0
-        },
-        'odd': {
-            'count': odd_count,
-            'percentage': round(odd_count / total_count * 100, 1) if total_count > 0 else 0
-        },
-        'even': {
-            'count': even_count,
-            'percentage': round(even_count / total_count * 100, 1) if total_count > 0 else 0
-        }
+        'big': count_entry(int(size_counts[SIZE_BIG]), total_count),
+        'small': count_entry(int(size_counts[SIZE_SMALL]), total_count),
+        'odd': count_entry(int(parity_counts[PARITY_ODD]), total_count),
+        'even': count_entry(int(parity_counts[PARITY_EVEN]), total_count)
     }
 
+# 组合编码与统计键的对应关系
+COMBO_STAT_KEYS = {
+    SIZE_BIG * 2 + PARITY_ODD: 'big_odd',
+    SIZE_BIG * 2 + PARITY_EVEN: 'big_even',
+    SIZE_SMALL * 2 + PARITY_ODD: 'small_odd',
+    SIZE_SMALL * 2 + PARITY_EVEN: 'small_even'
+}
+
 # 计算组合统计信息
-def calculate_combo_stats(lottery_data):
-    big_odd_count = 0
-    big_even_count = 0
-    small_odd_count = 0
-    small_even_count = 0
-    total_count = len(lottery_data)
-    
-    for record in lottery_data:
-        if 'size' in record and 'odd_even' in record:
-            if record['size'] == '大' and record['odd_even'] == '单':
-                big_odd_count += 1
-            elif record['size'] == '大' and record['odd_even'] == '双':
-                big_even_count += 1
-            elif record['size'] == '小' and record['odd_even'] == '单':
-                small_odd_count += 1
-            elif record['size'] == '小' and record['odd_even'] == '双':
-                small_even_count += 1
+def calculate_combo_stats(block):
+    total_count = len(block)
+    combo_counts = count_codes(block.combo_codes(), 4)
     
     return {
-        'big_odd': {
-            'count': big_odd_count,
-            'percentage': round(big_odd_count / total_count * 100, 1) if total_count > 0 else 0
-        },
-        'big_even': {
-            'count': big_even_count,
-            'percentage': round(big_even_count / total_count * 100, 1) if total_count > 0 else 0
-        },
-        'small_odd': {
-            'count': small_odd_count,
-            'percentage': round(small_odd_count / total_count * 100, 1) if total_count > 0 else 0
-        },
-        'small_even': {
-            'count': small_even_count,
-            'percentage': round(small_even_count / total_count * 100, 1) if total_count > 0 else 0
-        }
+        key: count_entry(int(combo_counts[code]), total_count)
+        for code, key in sorted(COMBO_STAT_KEYS.items(), key=lambda item: -item[0])
     }
 
 # 计算和值统计信息
-def calculate_sum_stats(lottery_data):
-    sum_counts = {}
-    total_count = len(lottery_data)
+def calculate_sum_stats(block):
+    total_count = len(block)
+    sum_counts = count_codes(block.sums, 28)
     
-    # 初始化和值计数
-    for i in range(28):
-        sum_counts[f"{i:02d}"] = {'count': 0, 'percentage': 0}
-    
-    # 统计和值出现次数
-    for record in lottery_data:
-        if 'number_sum' in record:
-            try:
-                number_sum = str(int(record['number_sum'])).zfill(2)
-                if number_sum in sum_counts:
-                    sum_counts[number_sum]['count'] += 1
-            except (ValueError, TypeError):
-                # 跳过无法转换的值
-                pass
-    
-    # 计算百分比
-    if total_count > 0:
-        for key in sum_counts:
-            sum_counts[key]['percentage'] = round(sum_counts[key]['count'] / total_count * 100, 1)
-    
-    return sum_counts
+    return {f"{i:02d}": count_entry(int(count), total_count) for i, count in enumerate(sum_counts)}
 
 # 计算形态统计信息
-def calculate_pattern_stats(lottery_data):
-    pattern_counts = {
-        'mixed': {'count': 0, 'percentage': 0},
-        'pair': {'count': 0, 'percentage': 0},
-        'straight': {'count': 0, 'percentage': 0},
-        'triple': {'count': 0, 'percentage': 0}
+def calculate_pattern_stats(block):
+    total_count = len(block)
+    pattern_counts = count_codes(block.pattern, 4)
+    
+    return {
+        'mixed': count_entry(int(pattern_counts[PATTERN_MIXED]), total_count),
+        'pair': count_entry(int(pattern_counts[PATTERN_PAIR]), total_count),
+        'straight': count_entry(int(pattern_counts[PATTERN_STRAIGHT]), total_count),
+        'triple': count_entry(int(pattern_counts[PATTERN_LEOPARD]), total_count)
     }
-    total_count = len(lottery_data)
-    
-    for record in lottery_data:
-        pattern = record.get('pattern')
-        if pattern is None or pattern == '杂六':
-            pattern_counts['mixed']['count'] += 1
-        elif pattern == '对子':
-            pattern_counts['pair']['count'] += 1
-        elif pattern == '顺子':
-            pattern_counts['straight']['count'] += 1
-        elif pattern == '豹子':
-            pattern_counts['triple']['count'] += 1
-    
-    # 计算百分比
-    if total_count > 0:
-        for key in pattern_counts:
-            pattern_counts[key]['percentage'] = round(pattern_counts[key]['count'] / total_count * 100, 1)
-    
-    return pattern_counts
 
 # 计算位置统计信息
-def calculate_position_stats(lottery_data):
-    # 初始化统计计数
-    extreme_small_count = 0
-    extreme_big_count = 0
-    middle_count = 0
-    total_count = len(lottery_data)
-    
-    for record in lottery_data:
-        if 'number_sum' in record:
-            try:
-                num_sum = int(record['number_sum'])
-                if num_sum <= 5:
-                    extreme_small_count += 1
-                elif num_sum >= 22:
-                    extreme_big_count += 1
-                else:
-                    middle_count += 1
-            except (ValueError, TypeError):
-                # 跳过无法转换的值
-                pass
-    
-    # 计算百分比
-    extreme_small_percentage = round(extreme_small_count / total_count * 100, 1) if total_count > 0 else 0
-    extreme_big_percentage = round(extreme_big_count / total_count * 100, 1) if total_count > 0 else 0
+def calculate_position_stats(block):
+    total_count = len(block)
+    sums = block.sums[block.sums != MISSING]
+    extreme_small_count = int(np.count_nonzero(sums <= 5))
+    extreme_big_count = int(np.count_nonzero(sums >= 22))
+    middle_count = len(sums) - extreme_small_count - extreme_big_count
     
     # 返回前端期望的格式
     return {
-        'extreme_small': {
-            'count': extreme_small_count,
-            'percentage': extreme_small_percentage
-        },
-        'extreme_big': {
-            'count': extreme_big_count,
-            'percentage': extreme_big_percentage
-        },
-        'small_edge': {
-            'count': extreme_small_count,
-            'percentage': extreme_small_percentage
-        },
-        'middle': {
-            'count': middle_count,
-            'percentage': round(middle_count / total_count * 100, 1) if total_count > 0 else 0
-        },
-        'big_edge': {
-            'count': extreme_big_count,
-            'percentage': extreme_big_percentage
-        }
+        'extreme_small': count_entry(extreme_small_count, total_count),
+        'extreme_big': count_entry(extreme_big_count, total_count),
+        'small_edge': count_entry(extreme_small_count, total_count),
+        'middle': count_entry(middle_count, total_count),
+        'big_edge': count_entry(extreme_big_count, total_count)
     }
 
-# 计算连续统计信息
-def calculate_continuous_stats(lottery_data):
-    # 初始化统计数据
-    continuous_stats = {
-        'big': {'max': 0, 'current': 0},
-        'small': {'max': 0, 'current': 0},
-        'odd': {'max': 0, 'current': 0},
-        'even': {'max': 0, 'current': 0},
-        'big_odd': {'max': 0, 'current': 0},
-        'big_even': {'max': 0, 'current': 0},
-        'small_odd': {'max': 0, 'current': 0},
-        'small_even': {'max': 0, 'current': 0}
-    }
-    
-    # 记录最后一次出现的类型
-    last_size = None
-    last_odd_even = None
-    last_combo = None
-    
-    # 倒序分析，从最新一期开始
-    for record in lottery_data:
-        size = record.get('size')
-        odd_even = record.get('odd_even')
-        
-        # 大小连续统计
-        if size == '大':
-            if last_size == '大':
-                continuous_stats['big']['current'] += 1
-            else:
-                continuous_stats['big']['current'] = 1
-            continuous_stats['small']['current'] = 0
-        elif size == '小':
-            if last_size == '小':
-                continuous_stats['small']['current'] += 1
-            else:
-                continuous_stats['small']['current'] = 1
-            continuous_stats['big']['current'] = 0
-        
-        # 单双连续统计
-        if odd_even == '单':
-            if last_odd_even == '单':
-                continuous_stats['odd']['current'] += 1
-            else:
-                continuous_stats['odd']['current'] = 1
-            continuous_stats['even']['current'] = 0
-        elif odd_even == '双':
-            if last_odd_even == '双':
-                continuous_stats['even']['current'] += 1
-            else:
-                continuous_stats['even']['current'] = 1
-            continuous_stats['odd']['current'] = 0
-        
-        # 组合连续统计
-        combo = None
-        if size and odd_even:
-            if size == '大' and odd_even == '单':
-                combo = 'big_odd'
-            elif size == '大' and odd_even == '双':
-                combo = 'big_even'
-            elif size == '小' and odd_even == '单':
-                combo = 'small_odd'
-            elif size == '小' and odd_even == '双':
-                combo = 'small_even'
-            
-            if combo:
-                if last_combo == combo:
-                    continuous_stats[combo]['current'] += 1
-                else:
-                    continuous_stats[combo]['current'] = 1
-                
-                # 重置其他组合
-                for other_combo in ['big_odd', 'big_even', 'small_odd', 'small_even']:
-                    if other_combo != combo:
-                        continuous_stats[other_combo]['current'] = 0
-        
-        # 更新最大连续次数
-        for key in continuous_stats:
-            if continuous_stats[key]['current'] > continuous_stats[key]['max']:
-                continuous_stats[key]['max'] = continuous_stats[key]['current']
-        
-        # 更新上一次类型
-        last_size = size
-        last_odd_even = odd_even
-        last_combo = combo
-    
+# 计算连续统计信息（按最新到最旧的顺序）
+def calculate_continuous_stats(block):
+    continuous_stats = {}
+    continuous_stats.update(continuous_runs(block.size, {SIZE_BIG: 'big', SIZE_SMALL: 'small'}))
+    continuous_stats.update(continuous_runs(block.parity, {PARITY_ODD: 'odd', PARITY_EVEN: 'even'}))
+    continuous_stats.update(continuous_runs(block.combo_codes(), COMBO_STAT_KEYS))
     return continuous_stats
 
 # 应用错误处理
@@ -983,6 +1094,9 @@ def admin_save_config():
     # 更新应用名称
     app.config['APP_NAME'] = config.SITE_CONFIG['title']
     
+    # 已缓存的页面包含旧配置，需要重新渲染
+    page_cache.bump_config_version()
+    
     # 记录日志
     app.logger.info("网站配置已更新，包括自定义HTML代码")
     app.logger.info(f"HTML代码功能状态: {'启用' if html_enabled else '禁用'}")
@@ -192,6 +192,11 @@ function initCountdown() {
     
     // 循环检查是否有新数据
     function checkNewDataLoop() {
+        // 已通过SSE接收新开奖推送时无需再轮询
+        if (window.lotteryStreamActive) {
+            return;
+        }
+        
         // 开始检查新数据的循环
         function startCheckLoop() {
             // 使用AJAX请求获取最新开奖结果
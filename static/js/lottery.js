@@ -152,14 +152,8 @@ $(document).ready(function() {
     // 初始化倒计时
     initCountdown();
     
-    // 1秒自动检查是否有新开奖数据
-    setInterval(function() {
-        // 只有在首页才自动刷新数据
-        if (window.location.pathname === '/' || window.location.pathname === '') {
-            // 检查是否有新数据
-            checkAndUpdateLatestResult();
-        }
-    }, 1000);
+    // 监听新开奖数据（优先使用服务端推送）
+    startLatestResultWatcher();
     
     // AJAX分页处理
     $('.page-ajax-link').click(function(e) {
@@ -182,34 +176,93 @@ $(document).ready(function() {
     }, 500);
 });
 
+// 监听新开奖数据：优先使用SSE推送，浏览器不支持或推送不可用时回退到1秒轮询
+function startLatestResultWatcher() {
+    // 只有在首页才自动刷新数据
+    if (window.location.pathname !== '/' && window.location.pathname !== '') {
+        return;
+    }
+    
+    if (!window.EventSource) {
+        startLatestResultPolling();
+        return;
+    }
+    
+    const source = new EventSource('/api/lottery/stream');
+    window.lotteryStreamActive = true;
+    
+    source.addEventListener('draw', function(event) {
+        try {
+            handleLatestResultData(JSON.parse(event.data));
+        } catch (e) {
+            console.error('解析开奖推送数据失败:', e);
+        }
+    });
+    
+    source.onerror = function() {
+        // 临时断开时浏览器会自动重连，只有连接被关闭时才回退到轮询
+        if (source.readyState === EventSource.CLOSED) {
+            console.warn('开奖推送不可用，回退到轮询模式');
+            window.lotteryStreamActive = false;
+            startLatestResultPolling();
+        }
+    };
+}
+
+// 启动1秒轮询检查新开奖数据
+function startLatestResultPolling() {
+    if (window.latestResultPollTimer) {
+        return;
+    }
+    window.latestResultPollTimer = setInterval(checkAndUpdateLatestResult, 1000);
+}
+
 // 检查并更新最新开奖信息
 function checkAndUpdateLatestResult() {
     $.get('/api/lottery/latest')
         .done(function(response) {
             if (response.status === 'success' && response.data) {
-                const latestDomQihao = $('#latest-qihao').text().trim();
-                const latestApiQihao = response.data.qihao;
-                
-                // 如果API返回的期号与当前显示的不同，说明有新数据
-                if (latestDomQihao && latestApiQihao && latestDomQihao !== latestApiQihao) {
-                    console.log('检测到新开奖数据，更新显示');
-                    
-                    // 更新最新开奖显示区域（updateLatestResult内部会处理历史记录的更新）
-                    updateLatestResult(response.data);
-                    
-                    // 显示新开奖通知
-                    showToast('新开奖', `期号 ${response.data.qihao} 已开奖`, 'success');
-                }
+                handleLatestResultData(response.data);
             }
         });
 }
 
+// 处理最新开奖数据（轮询和推送共用）
+function handleLatestResultData(data) {
+    const latestDomQihao = $('#latest-qihao').text().trim();
+    const latestApiQihao = data.qihao;
+    
+    // 如果返回的期号与当前显示的不同，说明有新数据
+    if (latestDomQihao && latestApiQihao && latestDomQihao !== latestApiQihao) {
+        console.log('检测到新开奖数据，更新显示');
+        
+        // 更新最新开奖显示区域（updateLatestResult内部会处理历史记录的更新）
+        updateLatestResult(data);
+        
+        // 咪牌开启时，数据更新完成后修复涂层
+        const peekStatus = $('#peek-btn').attr('data-status');
+        if (peekStatus === 'on' && window.LotteryScratch) {
+            setTimeout(() => {
+                try {
+                    window.LotteryScratch.repairLayers();
+                } catch (e) {
+                    console.error('修复涂层失败:', e);
+                }
+            }, 200);
+        }
+        
+        // 显示新开奖通知
+        showToast('新开奖', `期号 ${data.qihao} 已开奖`, 'success');
+    }
+}
+
 // 获取并更新最新开奖结果
 function fetchAndUpdateLatestResult(refreshBtn) {
     // 获取当前显示的期号，用于后续判断
     const currentQihao = $('#latest-qihao').text().trim();
     
-    $.get('/api/lottery/latest')
+    // 手动刷新后跳过浏览器缓存，确保拿到刚保存的数据
+    $.ajax({ url: '/api/lottery/latest', cache: false })
         .done(function(response) {
             if (response.status === 'success' && response.data) {
                 // 判断是否有新数据
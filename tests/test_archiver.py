@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""历史开奖数据归档的测试"""
+
+from datetime import datetime, timedelta
+import pytest
+import config
+import utils.archiver as archiver
+from utils.archiver import ArchiveJob, DrawArchive, unpack_records
+from utils.db_manager import DBManager, QIHAO_NUM_MIGRATION_ID
+
+mongomock = pytest.importorskip('mongomock')
+
+class FakeMongo:
+    """只提供db属性的Flask-PyMongo客户端"""
+
+    def __init__(self, db):
+        self.db = db
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().pc28platform
+
+@pytest.fixture
+def db_manager(db, monkeypatch):
+    monkeypatch.setattr(config, 'DATA_RETENTION_DAYS', 2)
+    # 数字期号回填已完成，按qihao_num索引查询最新记录
+    db.lottery_meta.insert_one({"_id": QIHAO_NUM_MIGRATION_ID, "completed_at": datetime.now()})
+    return DBManager(FakeMongo(db))
+
+def make_record(qihao_num, opentime_dt, number_sum=10):
+    opentime_dt = opentime_dt.replace(microsecond=0)
+    record = {
+        'qihao': str(qihao_num),
+        'result': '3+3+4',
+        'number_sum': number_sum,
+        'size': '小',
+        'odd_even': '双',
+        'opentime': opentime_dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'opentime_dt': opentime_dt
+    }
+    if qihao_num is not None:
+        record['qihao_num'] = qihao_num
+    return record
+
+def seed_days(db, days_ago, per_day=3, start=3000000):
+    """按天写入开奖记录，返回按期号升序的记录列表"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    records = []
+    for days in sorted(days_ago, reverse=True):
+        for i in range(per_day):
+            records.append(make_record(start + len(records), today - timedelta(days=days) + timedelta(minutes=10 * i)))
+    db.lottery_results.insert_many(records)
+    return records
+
+def stored_qihao_nums(db):
+    return sorted(doc['qihao_num'] for doc in db.lottery_results.find({"qihao_num": {"$exists": True}}))
+
+def test_rerun_merges_into_existing_day(db):
+    archive = DrawArchive(db)
+    day = datetime(2026, 1, 1, 12, 0)
+    first = [make_record(1, day), make_record(2, day + timedelta(minutes=5))]
+    db.lottery_results.insert_many(first)
+    assert archive.archive_day('2026-01-01', first) == [r['_id'] for r in first]
+
+    # 重复执行时合并到同一天的归档，主集合中的记录覆盖已归档的同一期
+    updated = dict(first[1], number_sum=20)
+    later = make_record(3, day + timedelta(minutes=10))
+    later['_id'] = db.lottery_results.insert_one(later).inserted_id
+    assert archive.archive_day('2026-01-01', [updated, later]) == [updated['_id'], later['_id']]
+
+    document = db.lottery_archive.find_one({"_id": '2026-01-01'})
+    assert (document['count'], document['first_qihao_num'], document['last_qihao_num']) == (3, 1, 3)
+    assert unpack_records(document['data']) == [first[0], updated, later]
+
+def test_records_without_numeric_qihao_are_kept(db_manager, db):
+    seed_days(db, [5])
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    db.lottery_results.insert_one(make_record(None, today - timedelta(days=5, hours=-1)))
+
+    assert ArchiveJob(db_manager).run_once() == 3
+    kept = list(db.lottery_results.find())
+    assert len(kept) == 1 and 'qihao_num' not in kept[0]
+
+def test_verify_mismatch_keeps_row(db_manager, db, monkeypatch):
+    records = seed_days(db, [5])
+    corrupted = records[1]['qihao_num']
+    pack_records = archiver.pack_records
+    monkeypatch.setattr(archiver, 'pack_records', lambda rows: pack_records(
+        [dict(row, number_sum=-1) if row['qihao_num'] == corrupted else row for row in rows]
+    ))
+
+    assert ArchiveJob(db_manager).run_once() == 2
+    assert stored_qihao_nums(db) == [corrupted]
+
+def test_losing_lock_stops_job(db_manager, db):
+    records = seed_days(db, [5, 4])
+    job = ArchiveJob(db_manager)
+    # 第一次获取成功，处理完第一天后续期失败
+    results = iter([True, False])
+    job.lock.acquire = lambda: next(results)
+
+    assert job.run_once() == 3
+    assert stored_qihao_nums(db) == [r['qihao_num'] for r in records[3:]]
+    assert list(db.lottery_archive.find({}, {"_id": 1})) == [{"_id": records[0]['opentime_dt'].strftime('%Y-%m-%d')}]
+    assert db.lottery_meta.find_one({"_id": "lock:archive"}) is None
+
+def test_reads_span_hot_and_archived_records(db_manager, db):
+    records = seed_days(db, [5, 4, 3, 1])
+    start = datetime.now() - timedelta(days=6)
+    end = datetime.now()
+
+    def snapshot():
+        by_date = [(d.qihao_num, d.number_sum, d.opentime) for d in db_manager.get_results_by_date_range(start, end)]
+        latest = [d.qihao_num for d in db_manager.iter_latest_results()]
+        return by_date, latest
+
+    before = snapshot()
+    assert ArchiveJob(db_manager).run_once() == 9
+    assert stored_qihao_nums(db) == [r['qihao_num'] for r in records[9:]]
+
+    assert snapshot() == before
+    assert before[1] == [r['qihao_num'] for r in reversed(records)]
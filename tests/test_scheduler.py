@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""调度器等待时间计算的测试"""
+
+from datetime import datetime, timedelta
+import config
+from utils.draw import Draw
+from utils.scheduler import LotteryScheduler
+
+class FakeDBManager:
+    """只提供最近开奖记录的数据库管理器"""
+
+    def __init__(self, latest_time, count=10):
+        self.records = [
+            Draw.from_doc({'opentime_dt': latest_time - timedelta(seconds=config.LOTTERY_INTERVAL * i)})
+            for i in range(count)
+        ] if latest_time else []
+
+    def get_latest_results(self, limit=30, skip=0, profile='list'):
+        return self.records[skip:skip + limit]
+
+def make_scheduler(latest_time):
+    return LotteryScheduler(api_client=None, db_manager=FakeDBManager(latest_time))
+
+def test_sleeps_until_shortly_before_expected_draw():
+    scheduler = make_scheduler(datetime.now() - timedelta(seconds=60))
+    delay = scheduler._next_delay()
+    expected = config.LOTTERY_INTERVAL - 60 - config.FETCH_LEAD_SECONDS
+    assert expected - 1 <= delay <= expected
+
+def test_polls_fast_inside_draw_window():
+    scheduler = make_scheduler(datetime.now() - timedelta(seconds=config.LOTTERY_INTERVAL + 5))
+    assert scheduler._next_delay() == config.DATA_UPDATE_INTERVAL
+
+def test_polls_fast_without_records():
+    assert make_scheduler(None)._next_delay() == config.DATA_UPDATE_INTERVAL
+
+def test_future_open_time_is_treated_as_unknown():
+    # 上游时钟偏差或年份错误导致最新开奖时间在未来，不应每次休眠一整个开奖周期
+    for skew in (timedelta(minutes=10), timedelta(hours=8), timedelta(days=365)):
+        scheduler = make_scheduler(datetime.now() + skew)
+        assert scheduler._next_delay() == config.DATA_UPDATE_INTERVAL
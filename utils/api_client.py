@@ -1,9 +1,11 @@
 import requests
 import json
 import logging
+import time
 from datetime import datetime
 import config
 import re
+from utils.http_client import ConditionalHttpClient
 
 logger = logging.getLogger(__name__)
 
@@ -13,28 +15,74 @@ class LotteryApiClient:
     def __init__(self, base_url=None):
         self.base_url = base_url or config.API_BASE_URL
         self.endpoint = config.API_ENDPOINT
+        # 复用连接的HTTP客户端，响应未变化时跳过解析
+        self.http = ConditionalHttpClient()
+        # 已入库的最大期号（水位线），用于跳过已处理的数据
+        self.last_qihao = None
+        self.last_fetch_time = None
+        # 上次请求发现期号断档时，下次使用大limit补齐
+        self._gap_detected = False
     
-    def get_lottery_results(self, page=1, result_type=None):
+    def set_watermark(self, qihao):
+        """
+        更新已入库的最大期号
+        
+        Args:
+            qihao: 数据库中已保存的最大期号
+        """
+        qihao_num = self._to_int(qihao)
+        if qihao_num is None:
+            return
+        if self.last_qihao is None or qihao_num > self.last_qihao:
+            self.last_qihao = qihao_num
+    
+    def _choose_limit(self):
+        """
+        根据水位线和距上次请求的时间选择请求条数
+        
+        Returns:
+            本次请求的limit参数
+        """
+        if self.last_qihao is None or self._gap_detected or self.last_fetch_time is None:
+            return config.API_LIMIT_MAX
+        
+        # 按开奖间隔估算停机期间错过的期数
+        elapsed = time.monotonic() - self.last_fetch_time
+        missed = int(elapsed // config.LOTTERY_INTERVAL) + 1
+        return min(config.API_LIMIT_MAX, max(config.API_LIMIT_CAUGHT_UP, missed + config.API_LIMIT_CAUGHT_UP))
+    
+    def get_lottery_results(self, page=1, result_type=None, incremental=True):
         """
         获取开奖结果数据
         
         Args:
             page: 页码 (保留参数但新API获取所有数据)
             result_type: 结果类型 (保留参数以兼容)
+            incremental: 是否只返回期号大于水位线的新数据
             
         Returns:
             包含开奖数据的列表，每个元素是一个字典
         """
         url = f"{self.base_url}{self.endpoint}"
+        limit = self._choose_limit() if incremental else config.API_LIMIT_MAX
+        params = {'limit': limit}
+        if not incremental:
+            # 非增量请求需要完整结果，不使用上次的校验信息
+            self.http.forget(url, params)
         
         try:
-            logger.info(f"请求开奖数据: {url}")
-            response = requests.get(url, timeout=config.API_DEFAULT_TIMEOUT)
-            response.raise_for_status()
+            logger.debug(f"请求开奖数据: {url}?limit={limit}")
+            response, changed = self.http.get(url, params=params, timeout=config.API_DEFAULT_TIMEOUT)
+            self.last_fetch_time = time.monotonic()
+            
+            if not changed:
+                logger.debug("开奖数据未变化，跳过解析")
+                return []
             
             # 直接解析JSON响应
             json_data = response.json()
-            results = self._parse_json_results(json_data)
+            min_qihao = self.last_qihao if incremental else None
+            results = self._parse_json_results(json_data, min_qihao=min_qihao, limit=limit)
             return results
             
         except requests.RequestException as e:
@@ -44,12 +92,69 @@ class LotteryApiClient:
             logger.error(f"解析JSON数据失败: {e}")
             return []
     
-    def _parse_json_results(self, json_data):
+    @staticmethod
+    def _to_int(qihao):
+        """将期号转换为整数，无法转换时返回None"""
+        try:
+            return int(str(qihao).strip())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _parse_full_opentime(opentime):
+        """解析带年份的开奖时间（YYYY-MM-DD HH:MM[:SS]），无法解析时返回None"""
+        for dt_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+            try:
+                return datetime.strptime(opentime.strip(), dt_format)
+            except ValueError:
+                continue
+        return None
+
+    def _filter_new_items(self, items, min_qihao, limit):
+        """
+        过滤掉期号不大于水位线的数据，并检测是否存在断档
+        
+        Args:
+            items: API返回的原始数据列表
+            min_qihao: 水位线期号，None表示不过滤
+            limit: 本次请求的limit参数
+            
+        Returns:
+            期号大于水位线的原始数据列表
+        """
+        if min_qihao is None:
+            self._gap_detected = False
+            return items
+        
+        new_items = []
+        oldest_returned = None
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            qihao_num = self._to_int(item.get('qihao'))
+            if qihao_num is None:
+                continue
+            if oldest_returned is None or qihao_num < oldest_returned:
+                oldest_returned = qihao_num
+            if qihao_num > min_qihao:
+                new_items.append(item)
+        
+        # 返回的数据已填满limit且最旧一期仍在水位线之后，说明中间有遗漏
+        self._gap_detected = (
+            len(items) >= limit and oldest_returned is not None and oldest_returned > min_qihao + 1
+        )
+        if self._gap_detected:
+            logger.warning(f"检测到期号断档（水位线 {min_qihao}，返回最旧期号 {oldest_returned}），下次将扩大请求条数")
+        return new_items
+    
+    def _parse_json_results(self, json_data, min_qihao=None, limit=None):
         """
         解析JSON中的开奖数据
         
         Args:
             json_data: API返回的JSON数据
+            min_qihao: 水位线期号，期号不大于该值的数据在解析前被跳过
+            limit: 本次请求的limit参数，用于断档检测
             
         Returns:
             解析后的数据列表
@@ -58,7 +163,8 @@ class LotteryApiClient:
             # 检查JSON结构 - 新API返回包含data字段的字典
             if isinstance(json_data, dict) and 'data' in json_data and isinstance(json_data['data'], list):
                 results = []
-                for item in json_data['data']:
+                items = self._filter_new_items(json_data['data'], min_qihao, limit or config.API_LIMIT_MAX)
+                for item in items:
                     # 检查必要字段是否存在
                     if all(key in item for key in ['qihao', 'opennum', 'opentime']):
                         # 解析开奖号码 - 格式为 "1+2+3"
@@ -87,8 +193,11 @@ class LotteryApiClient:
                             
                             # 处理时间格式
                             opentime = item['opentime']
+                            opentime_dt = None
                             # 确保时间格式正确，如果包含年份则移除
                             if opentime.count('-') > 1:
+                                # 保留带年份的完整开奖时间，入库时直接使用
+                                opentime_dt = self._parse_full_opentime(opentime)
                                 # 移除年份部分，只保留月日和时间
                                 match = re.search(r'\d{4}-(\d{2}-\d{2} \d{2}:\d{2}(?::\d{2})?)', opentime)
                                 if match:
@@ -103,6 +212,8 @@ class LotteryApiClient:
                                 'odd_even': '单' if number_sum % 2 == 1 else '双',  # 单双
                                 'opentime': opentime  # 开奖时间
                             }
+                            if opentime_dt:
+                                lottery_data['opentime_dt'] = opentime_dt
                             results.append(lottery_data)
                 
                 logger.info(f"成功解析 {len(results)} 条开奖记录")
@@ -122,7 +233,7 @@ class LotteryApiClient:
         Returns:
             最新一期开奖数据字典，如果没有则返回None
         """
-        results = self.get_lottery_results(page=1)
+        results = self.get_lottery_results(page=1, incremental=False)
         if results and len(results) > 0:
             return results[0]  # 第一个就是最新的
         return None 
\ No newline at end of file
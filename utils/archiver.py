@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28历史开奖数据归档
+
+超过 DATA_RETENTION_DAYS 天的开奖记录按天压缩保存到 lottery_archive 集合：
+整天的开奖记录以完整的BSON文档（包括_id和全部字段）按期号顺序拼接后用zlib压缩，
+解压后与 lottery_results 中的原始记录完全一致。归档写入后逐条与主集合中的记录比对，
+一致的记录才从主集合中删除。lottery_results 只保留近期数据，长期统计通过 DrawArchive 读取归档。
+"""
+
+import threading
+import zlib
+import logging
+from datetime import datetime, timedelta, timezone
+import bson
+import pymongo
+from bson.binary import Binary
+import config
+from utils.maintenance import MaintenanceLock
+
+logger = logging.getLogger(__name__)
+
+def pack_records(records):
+    """
+    将一天的开奖记录压缩为归档数据
+
+    Args:
+        records: 开奖记录字典列表（按期号升序）
+
+    Returns:
+        压缩后的字节串
+    """
+    return zlib.compress(b''.join(bson.encode(record) for record in records), 9)
+
+def unpack_records(data):
+    """
+    解压一天的归档数据
+
+    Args:
+        data: 压缩后的归档数据
+
+    Returns:
+        开奖记录列表（按期号升序），与归档前 lottery_results 中的文档一致
+    """
+    return bson.decode_all(zlib.decompress(data))
+
+class DrawArchive:
+    """按天压缩保存的历史开奖数据"""
+
+    def __init__(self, db):
+        """
+        Args:
+            db: MongoDB数据库对象
+        """
+        self.collection = db.lottery_archive
+        try:
+            self.collection.create_index([("first_qihao_num", pymongo.ASCENDING)])
+        except Exception as e:
+            logger.error(f"创建归档索引失败: {e}")
+
+    def archive_day(self, date, records):
+        """
+        将一天的开奖记录合并到归档中，写入后读回并与原记录逐字段比对
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+            records: 该日期的开奖记录列表（完整文档）
+
+        Returns:
+            已归档且与归档内容一致的记录 _id 列表（缺少数字期号或比对不一致的记录不包含在内）
+        """
+        merged = {}
+        for record in records:
+            if not isinstance(record.get('qihao_num'), int):
+                logger.warning(f"开奖记录缺少数字期号，保留在主集合中 (期号: {record.get('qihao', '未知')})")
+                continue
+            merged[record['qihao_num']] = record
+        if not merged:
+            return []
+        candidates = list(merged.values())
+
+        # 与已归档的数据合并，重复执行时以主集合中的记录为准
+        existing = self.collection.find_one({"_id": date})
+        if existing:
+            for record in unpack_records(existing['data']):
+                merged.setdefault(record['qihao_num'], record)
+
+        qihao_nums = sorted(merged)
+        self.collection.update_one(
+            {"_id": date},
+            {"$set": {
+                "count": len(qihao_nums),
+                "first_qihao_num": qihao_nums[0],
+                "last_qihao_num": qihao_nums[-1],
+                "data": Binary(pack_records([merged[n] for n in qihao_nums])),
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+        return self._verify(date, candidates)
+
+    def _verify(self, date, records):
+        """
+        读回归档并逐字段比对，返回与归档内容一致的记录 _id 列表
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+            records: 主集合中的原始记录
+
+        Returns:
+            可以从主集合中删除的记录 _id 列表
+        """
+        document = self.collection.find_one({"_id": date})
+        archived = {record['_id']: record for record in unpack_records(document['data'])} if document else {}
+        verified = []
+        for record in records:
+            if archived.get(record['_id']) == record:
+                verified.append(record['_id'])
+            else:
+                logger.error(f"归档内容与原记录不一致，保留在主集合中 (日期: {date}, 期号: {record.get('qihao', '未知')})")
+        return verified
+
+    def get_range(self):
+        """
+        获取归档记录的范围
+
+        Returns:
+            (最早的数字期号, 记录数)，没有归档时为 (None, 0)
+        """
+        first = None
+        count = 0
+        try:
+            for document in self.collection.find({}, {"first_qihao_num": 1, "count": 1}):
+                count += document['count']
+                if first is None or document['first_qihao_num'] < first:
+                    first = document['first_qihao_num']
+        except Exception as e:
+            logger.error(f"读取归档范围失败: {e}")
+        return first, count
+
+    def get_records(self, start, end):
+        """
+        获取时间范围内的归档开奖记录
+
+        Args:
+            start: 开始时间
+            end: 结束时间（包含）
+
+        Returns:
+            开奖记录列表（按开奖时间降序）
+        """
+        results = []
+        try:
+            cursor = self.collection.find({
+                "_id": {"$gte": start.strftime('%Y-%m-%d'), "$lte": end.strftime('%Y-%m-%d')}
+            })
+            for document in cursor:
+                results.extend(r for r in unpack_records(document['data']) if start <= r['opentime_dt'] <= end)
+        except Exception as e:
+            logger.error(f"读取归档数据失败: {e}")
+        results.sort(key=lambda r: r['opentime_dt'], reverse=True)
+        return results
+
+    def get_by_qihao_num(self, qihao_num):
+        """按数字期号查找归档记录，不存在时返回None"""
+        try:
+            document = self.collection.find_one({
+                "first_qihao_num": {"$lte": qihao_num},
+                "last_qihao_num": {"$gte": qihao_num}
+            })
+        except Exception as e:
+            logger.error(f"读取归档数据失败: {e}")
+            return None
+        if document:
+            for record in unpack_records(document['data']):
+                if record['qihao_num'] == qihao_num:
+                    return record
+        return None
+
+    def iter_records_desc(self, before_qihao_num=None):
+        """
+        按期号降序遍历归档记录
+
+        Args:
+            before_qihao_num: 只返回小于该期号的记录
+
+        Returns:
+            开奖记录迭代器
+        """
+        try:
+            for document in self.collection.find().sort("_id", pymongo.DESCENDING):
+                for record in reversed(unpack_records(document['data'])):
+                    if before_qihao_num is None or record['qihao_num'] < before_qihao_num:
+                        yield record
+        except Exception as e:
+            logger.error(f"遍历归档数据失败: {e}")
+
+class ArchiveJob:
+    """定期将超过保留天数的开奖记录移入归档"""
+
+    def __init__(self, db_manager, depends_on=()):
+        """
+        Args:
+            db_manager: 数据库管理器实例
+            depends_on: 归档前必须完成的迁移（如开奖时间修正，归档按开奖日期分组）
+        """
+        self.db_manager = db_manager
+        self.db = db_manager.db
+        self.archive = db_manager.archive
+        self.depends_on = list(depends_on)
+        self.lock = MaintenanceLock(self.db, 'archive')
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._status_lock = threading.Lock()
+        self._status = {'last_run': None, 'last_archived': 0, 'total_archived': 0, 'cutoff': None}
+
+    def get_status(self):
+        """获取归档任务状态"""
+        with self._status_lock:
+            return dict(self._status)
+
+    def start(self):
+        """在后台线程中定期执行归档"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='draw-archive', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止归档线程"""
+        self._stop_event.set()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(config.ARCHIVE_CHECK_INTERVAL)
+
+    def run_once(self):
+        """
+        归档早于保留期的开奖记录（按天处理），其他进程正在归档时直接返回
+
+        Returns:
+            本次归档的记录数
+        """
+        if not all(migration.is_done() for migration in self.depends_on):
+            logger.info("等待后台迁移完成后再归档")
+            return 0
+        if not self.lock.acquire():
+            return 0
+
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff = today - timedelta(days=config.DATA_RETENTION_DAYS)
+        total = 0
+        try:
+            lower = datetime.min
+            while not self._stop_event.is_set():
+                oldest = self.db.lottery_results.find_one(
+                    {"opentime_dt": {"$gte": lower, "$lt": cutoff}},
+                    {"opentime_dt": 1},
+                    sort=[("opentime_dt", pymongo.ASCENDING)]
+                )
+                if not oldest:
+                    break
+
+                day = oldest['opentime_dt'].replace(hour=0, minute=0, second=0, microsecond=0)
+                lower = min(day + timedelta(days=1), cutoff)
+                records = list(self.db.lottery_results.find({"opentime_dt": {"$gte": day, "$lt": lower}}))
+
+                # 先写入归档再删除主集合中的记录，中途失败时重复执行会合并到同一天的归档
+                archived_ids = self.archive.archive_day(day.strftime('%Y-%m-%d'), records)
+                if archived_ids:
+                    self.db.lottery_results.delete_many({"_id": {"$in": archived_ids}})
+                    total += len(archived_ids)
+                    logger.info(f"已归档 {day.strftime('%Y-%m-%d')} 的 {len(archived_ids)} 条开奖记录")
+
+                if not self.lock.acquire():
+                    logger.warning("归档中断：维护锁已失效")
+                    break
+        except Exception as e:
+            logger.error(f"归档开奖记录失败: {e}")
+        finally:
+            self.lock.release()
+
+        with self._status_lock:
+            self._status.update({
+                'last_run': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'last_archived': total,
+                'total_archived': self._status['total_archived'] + total,
+                'cutoff': cutoff.strftime('%Y-%m-%d')
+            })
+        return total
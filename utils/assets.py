@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28静态资源构建
+
+启动时将 static/css 和 static/js 下的文件压缩后以内容哈希命名写入 static/dist，
+页面中一起加载的文件再合并为少量的包。url_for('static', ...) 通过清单输出带哈希的文件名，
+文件内容变化时文件名随之变化，浏览器可以长期缓存。
+使用rjsmin/rcssmin压缩，未安装时不构建，页面直接加载源文件。
+"""
+
+import os
+import hashlib
+import logging
+
+try:
+    import rjsmin
+except ImportError:  # 未安装时不构建静态资源
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:  # 未安装时不构建静态资源
+    rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+# 合并后的资源包：包名 -> 按加载顺序排列的源文件（相对static目录），
+# 单独加载的文件不需要配置，通过url_for直接引用压缩后的文件；
+# 页面脚本保持各自独立加载，避免一个模块的顶层错误中断其他模块
+ASSET_BUNDLES = {
+    'site.css': ['css/style.css', 'css/responsive.css']
+}
+
+# 参与构建的源文件目录和扩展名
+ASSET_SOURCE_DIRS = ('css', 'js')
+ASSET_EXTENSIONS = ('.css', '.js')
+
+# 文件名中内容哈希的长度
+HASH_LENGTH = 10
+
+def minify_css(source):
+    """
+    压缩CSS
+
+    Args:
+        source: CSS源码
+
+    Returns:
+        压缩后的CSS
+    """
+    return rcssmin.cssmin(source)
+
+def minify_js(source):
+    """
+    压缩JS
+
+    Args:
+        source: JS源码
+
+    Returns:
+        压缩后的JS
+    """
+    return rjsmin.jsmin(source)
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+class AssetManifest:
+    """带内容哈希的静态资源清单"""
+
+    def __init__(self, static_folder, bundles=None, output_dir='dist'):
+        """
+        Args:
+            static_folder: 静态文件目录
+            bundles: 资源包配置，默认使用ASSET_BUNDLES
+            output_dir: 构建结果目录（相对静态文件目录）
+        """
+        self.static_folder = static_folder
+        self.bundles = bundles or ASSET_BUNDLES
+        self.output_dir = output_dir
+        self._files = {}    # 源文件 -> 构建后的文件
+        self._bundles = {}  # 包名 -> 构建后的文件
+
+    @property
+    def is_built(self):
+        """是否已成功构建"""
+        return bool(self._files)
+
+    def _read(self, filename):
+        with open(os.path.join(self.static_folder, filename), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _write(self, name, content):
+        """以内容哈希命名写入构建目录，返回相对静态文件目录的路径"""
+        data = content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        stem, ext = os.path.splitext(os.path.basename(name))
+        filename = f"{self.output_dir}/{stem}.{digest}{ext}"
+        path = os.path.join(self.static_folder, filename)
+        if not os.path.exists(path):
+            # 先写临时文件再替换，多个进程同时构建时不会读到不完整的文件
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return filename
+
+    def build(self):
+        """
+        压缩全部源文件并生成资源包，失败时保持未构建状态（页面使用源文件）
+
+        Returns:
+            是否构建成功
+        """
+        if rjsmin is None or rcssmin is None:
+            logger.error("未安装rjsmin/rcssmin，不构建静态资源，使用源文件")
+            return False
+
+        try:
+            os.makedirs(os.path.join(self.static_folder, self.output_dir), exist_ok=True)
+            minified = {}
+            for directory in ASSET_SOURCE_DIRS:
+                root = os.path.join(self.static_folder, directory)
+                for name in sorted(os.listdir(root)):
+                    ext = os.path.splitext(name)[1]
+                    if ext in ASSET_EXTENSIONS:
+                        filename = f"{directory}/{name}"
+                        minified[filename] = MINIFIERS[ext](self._read(filename))
+
+            files = {filename: self._write(filename, content) for filename, content in minified.items()}
+            bundles = {}
+            for name, sources in self.bundles.items():
+                # JS文件之间加分号，避免上一个文件末尾缺少分号时与下一个文件连在一起
+                separator = '\n' if name.endswith('.css') else ';\n'
+                bundles[name] = self._write(name, separator.join(minified[source] for source in sources))
+        except Exception as e:
+            logger.error(f"构建静态资源失败，使用源文件: {e}")
+            return False
+
+        self._files = files
+        self._bundles = bundles
+        self._remove_stale(set(files.values()) | set(bundles.values()))
+        original = sum(os.path.getsize(os.path.join(self.static_folder, f)) for f in files)
+        built = sum(len(content.encode('utf-8')) for content in minified.values())
+        logger.info(f"静态资源构建完成: {len(files)} 个文件, {len(bundles)} 个资源包, {original} -> {built} 字节")
+        return True
+
+    def _remove_stale(self, current):
+        """删除构建目录中不属于本次构建结果的文件（之前版本的资源），写入中的临时文件保留"""
+        directory = os.path.join(self.static_folder, self.output_dir)
+        removed = 0
+        for name in os.listdir(directory):
+            if name.endswith('.tmp') or f"{self.output_dir}/{name}" in current:
+                continue
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError as e:
+                logger.warning(f"删除旧的静态资源失败 ({name}): {e}")
+        if removed:
+            logger.info(f"已删除 {removed} 个旧的静态资源文件")
+
+    def resolve(self, filename):
+        """获取静态文件构建后的路径，未构建或不在清单中时返回原路径"""
+        return self._files.get(filename, filename)
+
+    def bundle_files(self, name):
+        """
+        获取页面加载资源包需要引用的文件
+
+        Args:
+            name: 包名
+
+        Returns:
+            已构建时为包含构建后资源包的列表，否则为源文件列表
+        """
+        if name in self._bundles:
+            return [self._bundles[name]]
+        return list(self.bundles[name])
+
+    def is_built_file(self, filename):
+        """是否为构建目录中的文件（内容不会变化，可以长期缓存）"""
+        return filename.startswith(f"{self.output_dir}/")
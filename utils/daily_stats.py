@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28按日预聚合统计
+
+已结束且有开奖记录的日期在 lottery_daily_stats 集合中保存一份原始计数文档（WindowStats.to_counters），
+跨日时保存前一天的文档，补入更早日期的记录时重建对应日期的文档。
+当天的统计在内存中随开奖增量累加，按日期查询时只需读取一份文档。
+"""
+
+import threading
+import logging
+from datetime import datetime, timedelta
+import pymongo
+from utils.stats_engine import WindowStats, draw_codes
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%d'
+
+def draw_date(record):
+    """
+    获取开奖记录所属日期
+
+    Args:
+        record: 开奖记录（Draw对象）
+
+    Returns:
+        开奖日期字符串（YYYY-MM-DD），缺少开奖时间时返回None
+    """
+    if record.opentime_dt is not None:
+        return record.opentime_dt.strftime(DATE_FORMAT)
+    return None
+
+class DailyStatsStore:
+    """按日统计的存储和当天统计的内存累加"""
+
+    def __init__(self, db_manager):
+        """
+        初始化按日统计
+
+        Args:
+            db_manager: 数据库管理器实例
+        """
+        self.db_manager = db_manager
+        self.collection = db_manager.db.lottery_daily_stats
+        self._lock = threading.Lock()
+        self._today = None  # 最新一期所属日期
+        self._today_stats = WindowStats()
+        self._head_qihao_num = None
+        self.is_loaded = False
+        try:
+            self.collection.create_index([("date", pymongo.ASCENDING)], unique=True)
+        except Exception as e:
+            logger.error(f"创建按日统计索引失败: {e}")
+
+    def _fetch_day_records(self, date):
+        """按期号升序获取指定日期的全部开奖记录"""
+        start = datetime.strptime(date, DATE_FORMAT)
+        end = start + timedelta(days=1) - timedelta(microseconds=1)
+        records = self.db_manager.get_results_by_date_range(start, end, profile='stats')
+        records.sort(key=lambda r: r.qihao_num or 0)
+        return records
+
+    def _build_day_stats(self, records):
+        """由按期号升序排列的开奖记录构建当日统计"""
+        stats = WindowStats()
+        for record in records:
+            stats.add(draw_codes(record))
+        return stats
+
+    def load_today(self):
+        """以最新一期所属日期为当天，从数据库重建当天统计"""
+        latest = self.db_manager.get_latest_result()
+        today = draw_date(latest) if latest else None
+        records = self._fetch_day_records(today) if today else []
+        with self._lock:
+            self._today = today
+            self._today_stats = self._build_day_stats(records)
+            self._head_qihao_num = records[-1].qihao_num if records else None
+            self.is_loaded = True
+        logger.info(f"当天统计已加载: {today}, {len(records)} 期")
+
+    def add_draws(self, records):
+        """
+        加入新开奖记录，跨日时保存前一天的统计文档，补入更早日期的记录时重建对应日期的文档
+
+        Args:
+            records: 新开奖记录列表（按期号降序）
+        """
+        closed_days = set()
+        with self._lock:
+            if not self.is_loaded:
+                return
+            # 早于当天的记录改变了已结束日期的统计
+            if self._today is not None:
+                closed_days.update(date for date in map(draw_date, records)
+                                   if date is not None and date < self._today)
+            ordered = sorted(records, key=lambda r: r.qihao_num)
+            if self._head_qihao_num is not None and ordered[0].qihao_num <= self._head_qihao_num:
+                # 补入了更早的记录，当天统计需要重建
+                reload = True
+            else:
+                reload = False
+                for record in ordered:
+                    date = draw_date(record)
+                    if date is None:
+                        continue
+                    if self._today is None or date > self._today:
+                        if self._today is not None:
+                            closed_days.add(self._today)
+                        self._today = date
+                        self._today_stats = WindowStats()
+                    elif date < self._today:
+                        continue
+                    self._today_stats.add(draw_codes(record))
+                    self._head_qihao_num = record.qihao_num
+
+        if reload:
+            self.load_today()
+        for date in sorted(closed_days):
+            self.close_day(date)
+
+    def close_day(self, date):
+        """
+        从数据库重新统计已结束的日期，有开奖记录时保存统计文档
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+
+        Returns:
+            WindowStats实例
+        """
+        stats = self._build_day_stats(self._fetch_day_records(date))
+        if not stats.total:
+            return stats
+        try:
+            self.collection.update_one(
+                {"date": date},
+                {"$set": {"date": date, "counters": stats.to_counters(), "updated_at": datetime.now()},
+                 "$unset": {"stats": ""}},
+                upsert=True
+            )
+            logger.info(f"已保存按日统计: {date}, {stats.total} 期")
+        except Exception as e:
+            logger.error(f"保存按日统计失败 ({date}): {e}")
+        return stats
+
+    def invalidate_closed_days(self):
+        """删除全部已保存的统计文档（后台迁移更新了历史记录的字段后调用），查询时按需重建"""
+        try:
+            result = self.collection.delete_many({})
+            logger.info(f"已清除按日统计文档: {result.deleted_count} 个")
+        except Exception as e:
+            logger.error(f"清除按日统计文档失败: {e}")
+
+    def get_day_stats(self, date):
+        """
+        获取指定日期的统计结果
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+
+        Returns:
+            与 /api/stats 一致的统计结构（不含date字段）
+        """
+        with self._lock:
+            if self.is_loaded and date == self._today:
+                return self._today_stats.to_payload()
+            today = self._today
+
+        try:
+            document = self.collection.find_one({"date": date}, {"counters": 1})
+        except Exception as e:
+            logger.error(f"读取按日统计失败 ({date}): {e}")
+            document = None
+        if document and document.get('counters'):
+            return WindowStats.from_counters(document['counters']).to_payload()
+
+        # 早于当天且尚未保存的日期补建统计文档（没有开奖记录时不保存），之后的日期尚无开奖数据
+        if today is not None and date < today:
+            return self.close_day(date).to_payload()
+        return self._build_day_stats(self._fetch_day_records(date)).to_payload()
@@ -1,12 +1,159 @@
 import logging
+import threading
+import time
 import pymongo
-from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from datetime import datetime, timedelta
 from bson.objectid import ObjectId
 import config
-from utils.pattern_analyzer import analyze_lottery_result
+from utils.pattern_analyzer import pattern_fields
+from utils.maintenance import RecordMigration
+from utils.draw_cache import RecentDrawCache
+from utils.archiver import DrawArchive
+from utils.draw import Draw
 
 logger = logging.getLogger(__name__)
 
+# 开奖记录查询的字段配置：fields 为返回的字段（Draw 使用的字段之外的数据不读取），
+# batch_size 为游标每批从数据库读取的记录数
+QUERY_PROFILES = {
+    # 列表展示和接口响应：完整的开奖记录
+    'list': {
+        'fields': ('qihao', 'qihao_num', 'result', 'number_sum', 'size', 'odd_even',
+                   'pattern', 'extreme', 'position', 'opentime', 'opentime_dt'),
+        'batch_size': 100
+    },
+    # 计数类统计（统计引擎、按日统计、遗漏统计）
+    'stats': {
+        'fields': ('qihao_num', 'number_sum', 'size', 'odd_even', 'pattern', 'opentime_dt'),
+        'batch_size': 1000
+    },
+    # 号码分析和历史文件：在统计字段基础上需要开奖号码
+    'analysis': {
+        'fields': ('qihao_num', 'result', 'number_sum', 'size', 'odd_even', 'pattern', 'opentime_dt'),
+        'batch_size': 1000
+    }
+}
+
+def query_projection(profile):
+    """
+    获取查询字段配置对应的projection
+
+    Args:
+        profile: 字段配置名称（list、stats、analysis）
+
+    Returns:
+        MongoDB projection字典，只有list配置返回_id
+    """
+    projection = {field: 1 for field in QUERY_PROFILES[profile]['fields']}
+    if profile != 'list':
+        projection['_id'] = 0
+    return projection
+
+# 数字期号唯一索引的部分索引条件；按期号排序的查询需包含该条件才能使用索引
+NUMERIC_QIHAO = {"qihao_num": {"$type": "number"}}
+
+# 数字期号回填的迁移标记（保存在lottery_meta集合中），回填完成前部分记录缺少qihao_num
+QIHAO_NUM_MIGRATION_ID = 'qihao_num_backfill'
+
+# 数字期号回填完成前，在聚合中由期号字符串计算缺少的qihao_num（与原来按期号数字排序的方式一致）
+LEGACY_QIHAO_NUM = {"$ifNull": ["$qihao_num", {"$convert": {
+    "input": {"$trim": {"input": {"$toString": "$qihao"}}},
+    "to": "long",
+    "onError": None,
+    "onNull": None
+}}]}
+
+# 开奖时间允许晚于参考时间的范围（时钟误差、时区差异）
+OPEN_TIME_FUTURE_TOLERANCE = timedelta(days=1)
+
+# 开奖时间年份修正的迁移标记（保存在lottery_meta集合中）
+OPEN_TIME_MIGRATION_ID = 'opentime_dt_year_fix'
+
+def to_qihao_num(qihao):
+    """
+    将期号转换为整数，用于索引排序
+    
+    Args:
+        qihao: 期号（字符串或数字）
+        
+    Returns:
+        整数期号，无法转换时返回None
+    """
+    try:
+        return int(str(qihao).strip())
+    except (TypeError, ValueError):
+        return None
+
+def resolve_open_time(time_str, reference=None):
+    """
+    为不含年份的开奖时间（MM-DD HH:MM 或 MM-DD HH:MM:SS）补全年份
+    
+    在参考时间的前一年、当年和后一年中选择离参考时间最近的一个，
+    开奖时间最多比参考时间晚一天，避免跨年时把12月底的开奖归到新的一年。
+    
+    Args:
+        time_str: 开奖时间字符串
+        reference: 参考时间（入库时间），默认为当前时间
+        
+    Returns:
+        开奖时间datetime对象
+        
+    Raises:
+        ValueError: 时间字符串无法解析
+    """
+    reference = reference or datetime.now()
+    dt_format = "%m-%d %H:%M:%S" if len(time_str.split(':')) == 3 else "%m-%d %H:%M"
+    candidates = []
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            # 逐年解析以正确处理2月29日
+            candidates.append(datetime.strptime(f"{year}-{time_str}", f"%Y-{dt_format}"))
+        except ValueError:
+            continue
+    candidates = [dt for dt in candidates if dt <= reference + OPEN_TIME_FUTURE_TOLERANCE]
+    if not candidates:
+        raise ValueError(f"无法解析开奖时间: {time_str}")
+    return min(candidates, key=lambda dt: abs(dt - reference))
+
+class QihaoNumMigration(RecordMigration):
+    """为缺少数字期号(qihao_num)的历史记录补充该字段"""
+
+    MIGRATION_ID = QIHAO_NUM_MIGRATION_ID
+    PENDING_QUERY = {"qihao_num": {"$exists": False}}
+    PROJECTION = {"qihao": 1}
+
+    def build_update(self, record):
+        qihao_num = to_qihao_num(record.get('qihao'))
+        if qihao_num is None:
+            logger.warning(f"期号无法转换为数字，跳过回填 (期号: {record.get('qihao', '未知')})")
+            return None
+        return {"qihao_num": qihao_num}
+
+class OpenTimeMigration(RecordMigration):
+    """
+    按入库时间重新计算历史记录的开奖时间(opentime_dt)，修正跨年入库时的年份错误
+
+    入库时间取自记录ObjectId中的生成时间，迁移完成后在lottery_meta集合中记录标记，只执行一次
+    """
+
+    MIGRATION_ID = OPEN_TIME_MIGRATION_ID
+    PENDING_QUERY = {"opentime": {"$exists": True}}
+    PROJECTION = {"opentime": 1, "opentime_dt": 1}
+    RUN_ONCE = True
+
+    def build_update(self, record):
+        # ObjectId生成时间为UTC，转换为本地时间后与开奖时间比较
+        inserted_at = record['_id'].generation_time.astimezone().replace(tzinfo=None)
+        try:
+            opentime_dt = resolve_open_time(record['opentime'], inserted_at)
+        except (ValueError, AttributeError):
+            return None
+        if record.get('opentime_dt') == opentime_dt:
+            return None
+        return {"opentime_dt": opentime_dt}
+
 class DBManager:
     """MongoDB数据库管理器"""
     
@@ -19,144 +166,298 @@ class DBManager:
         """
         self.mongo = mongo_client
         self.db = mongo_client.db
+        self.recent_cache = RecentDrawCache(config.RECENT_CACHE_SIZE)
+        # 超过保留天数的开奖记录保存在压缩归档中
+        self.archive = DrawArchive(self.db)
+        self._cache_sync_lock = threading.Lock()
+        self._last_cache_sync = 0
+        # 新开奖记录进入缓冲区时的回调函数列表
+        self._draw_listeners = []
+        self._count_lock = threading.Lock()
+        self._record_count = None
+        self._count_reconciled_at = 0
+        self._qihao_num_migrated = False
         self._ensure_indexes()
+        self.warm_recent_cache()
+    
+    def _ensure_qihao_num_index(self):
+        """
+        创建数字期号的唯一索引
+
+        期号无法转换为数字的记录没有qihao_num字段，索引只包含数值类型的qihao_num，
+        避免多条缺少该字段的记录在唯一索引中以null冲突。之前创建的非部分索引会被替换。
+        """
+        keys = [("qihao_num", pymongo.DESCENDING)]
+        options = {"unique": True, "partialFilterExpression": {"qihao_num": {"$type": "number"}}}
+        try:
+            self.db.lottery_results.create_index(keys, **options)
+        except OperationFailure as e:
+            # 85: IndexOptionsConflict，86: IndexKeySpecsConflict
+            if e.code not in (85, 86):
+                raise
+            logger.info("替换数字期号索引为部分唯一索引")
+            self.db.lottery_results.drop_index(keys)
+            self.db.lottery_results.create_index(keys, **options)
     
     def _ensure_indexes(self):
         """确保创建必要的索引"""
         try:
             # 为期号创建唯一索引
             self.db.lottery_results.create_index([("qihao", pymongo.ASCENDING)], unique=True)
+            # 为数字期号创建降序唯一索引，用于获取最新N期
+            self._ensure_qihao_num_index()
             # 为开奖时间创建索引，用于排序
             self.db.lottery_results.create_index([("opentime", pymongo.DESCENDING)])
+            # 为完整开奖时间创建索引，用于按日期范围查询
+            self.db.lottery_results.create_index([("opentime_dt", pymongo.DESCENDING)])
             logger.info("数据库索引创建成功")
         except Exception as e:
             logger.error(f"创建索引失败: {e}")
     
+    def _qihao_num_ready(self):
+        """数字期号回填是否已完成（以迁移完成标记为准，完成后不再查询）"""
+        if not self._qihao_num_migrated:
+            try:
+                self._qihao_num_migrated = bool(self.db.lottery_meta.find_one(
+                    {"_id": QIHAO_NUM_MIGRATION_ID, "completed_at": {"$ne": None}}, {"_id": 1}
+                ))
+            except Exception as e:
+                logger.error(f"读取数字期号回填标记失败: {e}")
+        return self._qihao_num_migrated
+
+    def _find_latest(self, profile, after_qihao_num=None, skip=0, limit=0):
+        """
+        按数字期号降序查询开奖记录
+
+        数字期号回填完成后由qihao_num索引排序；回填进行中时部分记录（通常是最新的记录）还缺少qihao_num，
+        在聚合中由期号字符串计算后排序，最新记录仍按正确的顺序返回。
+
+        Args:
+            profile: 查询字段配置（list、stats、analysis）
+            after_qihao_num: 只返回大于该期号的记录
+            skip: 跳过记录数
+            limit: 返回记录数量限制，0表示不限
+
+        Returns:
+            记录文档的游标
+        """
+        query = dict(NUMERIC_QIHAO)
+        if after_qihao_num is not None:
+            query["qihao_num"] = {"$type": "number", "$gt": after_qihao_num}
+        batch_size = min(limit, QUERY_PROFILES[profile]['batch_size']) if limit else QUERY_PROFILES[profile]['batch_size']
+
+        if self._qihao_num_ready():
+            cursor = (self.db.lottery_results.find(query, query_projection(profile))
+                      .sort("qihao_num", pymongo.DESCENDING)
+                      .skip(skip)
+                      .limit(limit)
+                      .batch_size(batch_size))
+            return cursor
+
+        pipeline = [
+            {"$addFields": {"qihao_num": LEGACY_QIHAO_NUM}},
+            {"$match": query},
+            {"$sort": {"qihao_num": pymongo.DESCENDING}}
+        ]
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": query_projection(profile)})
+        return self.db.lottery_results.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+
+    def warm_recent_cache(self):
+        """从数据库加载最新的开奖记录到内存缓冲区"""
+        try:
+            cursor = self._find_latest('list', limit=self.recent_cache.capacity)
+            self.recent_cache.load([Draw.from_doc(doc) for doc in cursor])
+            self._last_cache_sync = time.monotonic()
+        except Exception as e:
+            logger.error(f"加载开奖缓存失败: {e}")
+    
+    def sync_recent_cache(self, force=False):
+        """
+        将数据库中比缓冲区更新的开奖记录合并到缓冲区
+        
+        其他进程写入的新记录也会在同步间隔内被发现。
+        
+        Args:
+            force: 是否忽略同步间隔立即同步
+            
+        Returns:
+            新加入缓冲区的记录数
+        """
+        if not self.recent_cache.is_loaded:
+            self.warm_recent_cache()
+            return 0
+        
+        now = time.monotonic()
+        if not force and now - self._last_cache_sync < config.RECENT_CACHE_SYNC_SECONDS:
+            return 0
+        
+        # 已有线程在同步时直接使用当前缓存
+        if not self._cache_sync_lock.acquire(blocking=force):
+            return 0
+        try:
+            head = self.recent_cache.head_qihao_num()
+            cursor = self._find_latest('list', after_qihao_num=head, limit=self.recent_cache.capacity)
+            records = [Draw.from_doc(doc) for doc in cursor]
+            self._last_cache_sync = now
+            return len(self._add_to_cache(records))
+        except Exception as e:
+            logger.error(f"同步开奖缓存失败: {e}")
+            return 0
+        finally:
+            self._cache_sync_lock.release()
+    
+    def _refresh_cached_records(self, qihao_nums):
+        """重新读取指定期号的记录并更新到缓冲区"""
+        try:
+            cursor = self.db.lottery_results.find({"qihao_num": {"$in": qihao_nums}}, query_projection('list'))
+            self._add_to_cache([Draw.from_doc(doc) for doc in cursor])
+        except Exception as e:
+            logger.error(f"更新开奖缓存失败: {e}")
+    
+    def add_draw_listener(self, callback):
+        """
+        注册新开奖回调
+        
+        无论新记录由本进程保存还是从数据库同步得到，都只会通知一次。
+        
+        Args:
+            callback: 回调函数，参数为新开奖记录列表（按期号降序）
+        """
+        self._draw_listeners.append(callback)
+    
+    def _add_to_cache(self, records):
+        """将记录合并到缓冲区，并通知新开奖回调"""
+        new_records = self.recent_cache.add(records)
+        if new_records:
+            for callback in self._draw_listeners:
+                try:
+                    callback(new_records)
+                except Exception as e:
+                    logger.error(f"新开奖回调执行失败: {e}")
+        return new_records
+    
+    def get_high_water_mark(self):
+        """
+        获取已保存的最大数字期号
+        
+        Returns:
+            最大数字期号，数据库为空时返回None
+        """
+        self.sync_recent_cache()
+        head = self.recent_cache.head_qihao_num()
+        if head is not None:
+            return head
+        try:
+            latest = next(iter(self._find_latest('stats', limit=1)), None)
+            return latest['qihao_num'] if latest else None
+        except Exception as e:
+            logger.error(f"获取最大期号失败: {e}")
+            return None
+    
+    def _prepare_lottery_record(self, result):
+        """补充开奖时间和形态分析字段"""
+        # 转换开奖时间字符串为日期时间对象，方便排序（API已提供完整时间时直接使用）
+        if 'opentime' in result and not isinstance(result.get('opentime_dt'), datetime):
+            try:
+                # 支持两种格式：MM-DD HH:MM 或 MM-DD HH:MM:SS，年份按当前时间推断
+                result['opentime_dt'] = resolve_open_time(result['opentime'])
+                logger.debug(f"解析开奖时间: {result['opentime']} -> {result['opentime_dt']}")
+            except Exception as e:
+                logger.warning(f"解析开奖时间失败 ({result.get('opentime', 'unknown')}): {e}")
+                result['opentime_dt'] = datetime.now()
+        
+        # 分析开奖结果形态
+        if 'result' in result and 'number_sum' in result:
+            result.update(pattern_fields(result['result'], result['number_sum']))
+    
     def save_lottery_results(self, results):
         """
         保存开奖结果到数据库
         
+        期号不大于已保存最大期号的记录直接跳过，其余记录通过一次
+        无序bulk_write批量upsert。
+        
         Args:
             results: 开奖结果列表
             
         Returns:
-            保存成功的记录数
+            保存统计字典：inserted（新增数）、modified（更新数）、skipped（跳过数）
         """
+        summary = {'inserted': 0, 'modified': 0, 'skipped': 0}
         if not results:
-            return 0
-            
-        saved_count = 0
+            return summary
+        
+        high_water_mark = self.get_high_water_mark()
+        operations = []
+        pending_qihao_nums = []
         for result in results:
             try:
-                # 转换开奖时间字符串为日期时间对象，方便排序
-                if 'opentime' in result:
-                    try:
-                        # 尝试解析日期时间
-                        # 支持两种格式：MM-DD HH:MM 或 MM-DD HH:MM:SS
-                        dt_format = "%m-%d %H:%M"
-                        time_str = result['opentime']
-                        
-                        # 如果包含秒，调整格式
-                        if len(time_str.split(':')) == 3:
-                            dt_format = "%m-%d %H:%M:%S"
-                        
-                        # 添加当前年份 (仅用于内部排序，存储仍保持原始格式)
-                        current_year = datetime.now().year
-                        time_str_with_year = f"{current_year}-{time_str}"
-                        
-                        # 解析完整日期时间
-                        result['opentime_dt'] = datetime.strptime(time_str_with_year, f"%Y-{dt_format}")
-                        logger.debug(f"解析开奖时间: {time_str} -> {result['opentime_dt']}")
-                    except Exception as e:
-                        logger.warning(f"解析开奖时间失败 ({result.get('opentime', 'unknown')}): {e}")
-                        result['opentime_dt'] = datetime.now()
+                # 数字期号，用于索引排序
+                qihao_num = to_qihao_num(result.get('qihao'))
+                if qihao_num is None:
+                    logger.warning(f"期号无法转换为数字，跳过保存 (期号: {result.get('qihao', '未知')})")
+                    continue
                 
-                # 分析开奖结果形态
-                if 'result' in result and 'number_sum' in result:
-                    pattern_analysis = analyze_lottery_result(result['result'], int(result['number_sum']))
-                    if pattern_analysis and 'basic' in pattern_analysis:
-                        # 只保存基本形态（对子、顺子、豹子、杂六）
-                        result['pattern'] = pattern_analysis['basic']['name']
-                        result['pattern_type'] = pattern_analysis['basic']['pattern']
-                        
-                        # 保存极值和中边信息
-                        if pattern_analysis['extreme']:
-                            result['extreme'] = pattern_analysis['extreme']['name']
-                            result['extreme_type'] = pattern_analysis['extreme']['pattern']
-                        
-                        if pattern_analysis['position']:
-                            result['position'] = pattern_analysis['position']['name']
-                            result['position_type'] = pattern_analysis['position']['pattern']
+                # 已保存过的期号不再写入
+                if high_water_mark is not None and qihao_num <= high_water_mark:
+                    summary['skipped'] += 1
+                    continue
                 
-                # 使用期号作为唯一键，upsert确保不重复插入
-                query = {"qihao": result["qihao"]}
-                update = {"$set": result}
-                update_result = self.db.lottery_results.update_one(query, update, upsert=True)
+                result['qihao_num'] = qihao_num
+                self._prepare_lottery_record(result)
                 
-                if update_result.upserted_id or update_result.modified_count > 0:
-                    saved_count += 1
-                    
+                # 使用期号作为唯一键，upsert确保不重复插入
+                operations.append(UpdateOne({"qihao": result["qihao"]}, {"$set": result}, upsert=True))
+                pending_qihao_nums.append(qihao_num)
             except Exception as e:
-                logger.error(f"保存开奖结果失败 (期号: {result.get('qihao', '未知')}): {e}")
+                logger.error(f"处理开奖结果失败 (期号: {result.get('qihao', '未知')}): {e}")
+        
+        if operations:
+            try:
+                bulk_result = self.db.lottery_results.bulk_write(operations, ordered=False)
+                summary['inserted'] = bulk_result.upserted_count
+                summary['modified'] = bulk_result.modified_count
+            except BulkWriteError as e:
+                # 无序写入时其余操作仍会执行，按实际结果统计
+                summary['inserted'] = e.details.get('nUpserted', 0)
+                summary['modified'] = e.details.get('nModified', 0)
+                for error in e.details.get('writeErrors', []):
+                    logger.error(f"保存开奖结果失败: {error.get('errmsg')}")
+            except Exception as e:
+                logger.error(f"批量保存开奖结果失败: {e}")
+            
+            self._refresh_cached_records(pending_qihao_nums)
+            if summary['inserted']:
+                self._increment_record_count(summary['inserted'])
         
-        logger.info(f"成功保存 {saved_count} 条开奖记录")
-        return saved_count
+        logger.info(f"开奖记录保存完成: 新增 {summary['inserted']} 条, 更新 {summary['modified']} 条, 跳过 {summary['skipped']} 条")
+        return summary
     
-    def get_latest_results(self, limit=30, skip=0):
+    def get_latest_results(self, limit=30, skip=0, profile='list'):
         """
         获取最新的开奖结果
         
         Args:
             limit: 返回记录数量限制
             skip: 跳过记录数
+            profile: 查询字段配置（list、stats、analysis），缓冲区中的记录包含全部字段
             
         Returns:
-            最新的开奖结果列表
+            最新的开奖结果列表（Draw对象）
         """
+        # 优先从内存缓冲区读取，超出缓冲范围的旧数据再查询数据库
+        self.sync_recent_cache()
+        cached = self.recent_cache.get_slice(skip, limit)
+        if cached is not None:
+            return cached
+        
         try:
-            # 首先创建数字化期号的聚合管道
-            pipeline = [
-                # 添加一个字段，将期号转换为数字（如果转换失败则为0）
-                {
-                    "$addFields": {
-                        "numeric_qihao": {
-                            "$convert": {
-                                "input": "$qihao",
-                                "to": "int",
-                                "onError": 0
-                            }
-                        }
-                    }
-                },
-                # 按数字化期号降序排序
-                {
-                    "$sort": {
-                        "numeric_qihao": -1
-                    }
-                },
-                # 跳过指定数量的记录
-                {
-                    "$skip": skip
-                },
-                # 限制返回记录数
-                {
-                    "$limit": limit
-                }
-            ]
-            
-            # 执行聚合查询
-            cursor = self.db.lottery_results.aggregate(pipeline)
-            
-            results = list(cursor)
-            for result in results:
-                # 将ObjectId转换为字符串
-                if '_id' in result:
-                    result['_id'] = str(result['_id'])
-                # 移除临时字段
-                if 'numeric_qihao' in result:
-                    del result['numeric_qihao']
-            
-            return results
+            cursor = self._find_latest(profile, skip=skip, limit=limit)
+            return [Draw.from_doc(doc) for doc in cursor]
         except Exception as e:
             logger.error(f"获取最新开奖结果失败: {e}")
             return []
@@ -172,19 +473,84 @@ class DBManager:
         if results:
             return results[0]
         return None
+
+    def iter_latest_results(self, profile='stats'):
+        """
+        按期号降序逐条遍历全部开奖结果（包括归档数据），适用于需要向前回溯但不确定期数的统计
+
+        Args:
+            profile: 查询字段配置（list、stats、analysis）
+
+        Returns:
+            开奖结果（Draw对象）迭代器
+        """
+        oldest = None
+        try:
+            for doc in self._find_latest(profile):
+                draw = Draw.from_doc(doc)
+                if draw.qihao_num is not None:
+                    oldest = draw.qihao_num
+                yield draw
+        except Exception as e:
+            logger.error(f"遍历开奖结果失败: {e}")
+            return
+        
+        # 主集合遍历完后继续遍历归档数据
+        for doc in self.archive.iter_records_desc(before_qihao_num=oldest):
+            yield Draw.from_doc(doc)
     
+    def get_history_range(self):
+        """
+        获取数据库（含归档）中有数字期号的记录范围，用于核对历史文件是否完整
+
+        Returns:
+            (最早的数字期号, 记录数)，没有记录时为 (None, 0)
+        """
+        first, count = self.archive.get_range()
+        try:
+            count += self.db.lottery_results.count_documents(NUMERIC_QIHAO)
+            oldest = self.db.lottery_results.find_one(
+                NUMERIC_QIHAO, {"qihao_num": 1}, sort=[("qihao_num", pymongo.ASCENDING)]
+            )
+            if oldest and (first is None or oldest['qihao_num'] < first):
+                first = oldest['qihao_num']
+        except Exception as e:
+            logger.error(f"获取开奖记录范围失败: {e}")
+        return first, count
+
     def count_lottery_results(self):
         """
         获取开奖结果总数
         
+        计数由写入流程维护，并按RECORD_COUNT_RECONCILE_SECONDS间隔
+        使用estimated_document_count校准，读取时不再查询数据库。
+        
         Returns:
             开奖结果记录总数
         """
+        now = time.monotonic()
+        if self._record_count is None or now - self._count_reconciled_at >= config.RECORD_COUNT_RECONCILE_SECONDS:
+            self._reconcile_record_count()
+        return self._record_count or 0
+    
+    def _reconcile_record_count(self):
+        """使用集合元数据校准开奖记录计数"""
         try:
-            return self.db.lottery_results.count_documents({})
+            count = self.db.lottery_results.estimated_document_count()
+            with self._count_lock:
+                self._record_count = count
+                self._count_reconciled_at = time.monotonic()
         except Exception as e:
             logger.error(f"获取开奖结果总数失败: {e}")
-            return 0
+            with self._count_lock:
+                # 失败时推迟下次校准，避免每次读取都访问数据库
+                self._count_reconciled_at = time.monotonic()
+    
+    def _increment_record_count(self, count):
+        """写入新记录后更新计数"""
+        with self._count_lock:
+            if self._record_count is not None:
+                self._record_count += count
     
     def get_results_by_qihao(self, qihao):
         """
@@ -194,43 +560,69 @@ class DBManager:
             qihao: 期号
             
         Returns:
-            开奖结果记录，如不存在则返回None
+            开奖结果（Draw对象），如不存在则返回None
         """
         try:
-            result = self.db.lottery_results.find_one({"qihao": qihao})
-            if result:
-                result['_id'] = str(result['_id'])
-            return result
+            doc = self.db.lottery_results.find_one({"qihao": qihao}, query_projection('list'))
+            
+            # 主集合中不存在时查找归档数据
+            if not doc:
+                qihao_num = to_qihao_num(qihao)
+                doc = self.archive.get_by_qihao_num(qihao_num) if qihao_num is not None else None
+            return Draw.from_doc(doc) if doc else None
         except Exception as e:
             logger.error(f"通过期号获取开奖结果失败 (期号: {qihao}): {e}")
             return None
     
-    def get_results_by_date_range(self, start_date, end_date):
+    @staticmethod
+    def _to_datetime(value, end_of_day=False):
+        """将日期字符串（YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）转换为datetime，datetime原样返回"""
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            day = datetime.strptime(value, "%Y-%m-%d")
+            return day + timedelta(days=1, microseconds=-1) if end_of_day else day
+    
+    def get_results_by_date_range(self, start_date, end_date, profile='list'):
         """
-        通过日期范围获取开奖结果
+        通过日期范围获取开奖结果（由opentime_dt索引提供范围查询和排序）
         
         Args:
-            start_date: 开始日期
-            end_date: 结束日期
+            start_date: 开始时间，datetime或日期字符串
+            end_date: 结束时间（包含），datetime或日期字符串；只有日期时包含当天全天
+            profile: 查询字段配置（list、stats、analysis）
             
         Returns:
-            日期范围内的开奖结果列表
+            日期范围内的开奖结果（Draw对象）列表（按开奖时间降序，早于保留期的部分来自归档）
         """
         try:
+            start_dt = self._to_datetime(start_date)
+            end_dt = self._to_datetime(end_date, end_of_day=True)
             query = {
                 "opentime_dt": {
-                    "$gte": start_date,
-                    "$lte": end_date
+                    "$gte": start_dt,
+                    "$lte": end_dt
                 }
             }
-            cursor = self.db.lottery_results.find(query).sort("opentime_dt", -1)
-            results = list(cursor)
-            for result in results:
-                if '_id' in result:
-                    result['_id'] = str(result['_id'])
+            cursor = (self.db.lottery_results.find(query, query_projection(profile))
+                      .sort("opentime_dt", pymongo.DESCENDING)
+                      .batch_size(QUERY_PROFILES[profile]['batch_size']))
+            results = [Draw.from_doc(doc) for doc in cursor]
+            
+            # 范围早于保留期时合并归档数据（归档过程中两边都有的记录以主集合为准）
+            retention_start = datetime.now() - timedelta(days=config.DATA_RETENTION_DAYS + 1)
+            if start_dt < retention_start:
+                hot_qihao_nums = {result.qihao_num for result in results}
+                archived = [Draw.from_doc(doc) for doc in self.archive.get_records(start_dt, end_dt)
+                            if doc['qihao_num'] not in hot_qihao_nums]
+                if archived:
+                    results.extend(archived)
+                    results.sort(key=lambda r: r.opentime_dt, reverse=True)
             return results
         except Exception as e:
-            logger.error(f"按日期范围获取开奖结果失败: {e}")
+            logger.error(f"按日期范围获取开奖结果失败 ({start_date} 至 {end_date}): {e}")
             return []
     
     # ===== 广告管理相关方法 =====
@@ -375,41 +767,3 @@ class DBManager:
         except Exception as e:
             logger.error(f"按ID获取广告失败: {e}")
             return None
-        """
-        获取指定日期范围内的开奖结果
-        
-        Args:
-            start_date: 开始日期时间字符串，格式为'YYYY-MM-DD HH:MM:SS'
-            end_date: 结束日期时间字符串，格式为'YYYY-MM-DD HH:MM:SS'
-            
-        Returns:
-            日期范围内的开奖结果列表
-        """
-        try:
-            # 将日期字符串转换为datetime对象
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d %H:%M:%S")
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S")
-            
-            logger.info(f"开始日期时间: {start_dt}, 结束日期时间: {end_dt}")
-            
-            # 查询日期范围内的开奖结果
-            cursor = self.db.lottery_results.find({
-                "opentime_dt": {
-                    "$gte": start_dt,
-                    "$lte": end_dt
-                }
-            }).sort([("opentime_dt", pymongo.ASCENDING)])
-            
-            results = list(cursor)
-            result_count = len(results)
-            logger.info(f"日期范围查询结果数量: {result_count}")
-            
-            for result in results:
-                # 将ObjectId转换为字符串
-                if '_id' in result:
-                    result['_id'] = str(result['_id'])
-            
-            return results
-        except Exception as e:
-            logger.error(f"获取日期范围开奖结果失败 ({start_date} 至 {end_date}): {e}")
-            return [] 
\ No newline at end of file
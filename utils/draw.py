@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28开奖记录的内部表示
+
+DBManager 读取的开奖记录转换为 Draw 对象（__slots__，大小、单双、形态等以小整数编码保存），
+统计和分析代码直接读取编码；只在生成响应时通过 to_dict 转换为与数据库文档一致的字典。
+"""
+
+from datetime import datetime
+from utils.draw_block import (
+    MISSING, SIZE_CODES, PARITY_CODES, PATTERN_CODES, PATTERN_MIXED
+)
+from utils.pattern_analyzer import (
+    BASIC_RESULTS, EXTREME_RESULTS, POSITION_RESULTS, EXTREME_NONE, POSITION_NONE
+)
+
+# 记录中没有形态字段（尚未完成形态回填）时的形态编码，统计时按杂六计算
+PATTERN_ABSENT = -2
+
+SIZE_NAMES = {code: name for name, code in SIZE_CODES.items()}
+PARITY_NAMES = {code: name for name, code in PARITY_CODES.items()}
+UNKNOWN_PATTERN = {'pattern': 'unknown', 'name': '未知'}
+
+EXTREME_CODES = {result['name']: code for code, result in enumerate(EXTREME_RESULTS)}
+POSITION_CODES = {result['name']: code for code, result in enumerate(POSITION_RESULTS)}
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class Draw:
+    """一期开奖记录"""
+
+    __slots__ = (
+        'id', 'qihao', 'qihao_num', 'result', 'number_sum',
+        'size_code', 'parity_code', 'pattern_code', 'extreme_code', 'position_code',
+        'opentime', 'opentime_dt'
+    )
+
+    def __init__(self, id, qihao, qihao_num, result, number_sum, size_code, parity_code,
+                 pattern_code, extreme_code, position_code, opentime, opentime_dt):
+        self.id = id
+        self.qihao = qihao
+        self.qihao_num = qihao_num
+        self.result = result
+        self.number_sum = number_sum
+        self.size_code = size_code
+        self.parity_code = parity_code
+        self.pattern_code = pattern_code
+        self.extreme_code = extreme_code
+        self.position_code = position_code
+        self.opentime = opentime
+        self.opentime_dt = opentime_dt
+
+    @classmethod
+    def from_doc(cls, doc):
+        """
+        由数据库文档（或归档解压得到的字典）构建开奖记录
+
+        Args:
+            doc: 开奖记录字典，缺少的字段按缺失处理
+
+        Returns:
+            Draw实例
+        """
+        pattern = doc.get('pattern')
+        _id = doc.get('_id')
+        return cls(
+            id=str(_id) if _id is not None else None,
+            qihao=doc.get('qihao'),
+            qihao_num=doc.get('qihao_num'),
+            result=doc.get('result'),
+            number_sum=_to_int(doc.get('number_sum')),
+            size_code=SIZE_CODES.get(doc.get('size'), MISSING),
+            parity_code=PARITY_CODES.get(doc.get('odd_even'), MISSING),
+            pattern_code=PATTERN_ABSENT if pattern is None else PATTERN_CODES.get(pattern, MISSING),
+            extreme_code=EXTREME_CODES.get(doc.get('extreme'), EXTREME_NONE),
+            position_code=POSITION_CODES.get(doc.get('position'), POSITION_NONE),
+            opentime=doc.get('opentime'),
+            opentime_dt=doc.get('opentime_dt') if isinstance(doc.get('opentime_dt'), datetime) else None
+        )
+
+    @property
+    def size(self):
+        """大小名称（大、小），缺失时为None"""
+        return SIZE_NAMES.get(self.size_code)
+
+    @property
+    def odd_even(self):
+        """单双名称（单、双），缺失时为None"""
+        return PARITY_NAMES.get(self.parity_code)
+
+    @property
+    def stats_pattern_code(self):
+        """统计使用的形态编码：没有形态字段的记录按杂六统计"""
+        return PATTERN_MIXED if self.pattern_code == PATTERN_ABSENT else self.pattern_code
+
+    def _pattern_result(self):
+        if self.pattern_code == PATTERN_ABSENT:
+            return None
+        if 0 <= self.pattern_code < len(BASIC_RESULTS):
+            return BASIC_RESULTS[self.pattern_code]
+        return UNKNOWN_PATTERN
+
+    @property
+    def pattern(self):
+        """形态名称（杂六、对子、顺子、豹子），没有形态字段时为None"""
+        result = self._pattern_result()
+        return result['name'] if result else None
+
+    def to_dict(self):
+        """
+        转换为与数据库文档字段一致的字典，用于生成响应
+
+        Returns:
+            开奖记录字典
+        """
+        data = {
+            'qihao': self.qihao,
+            'qihao_num': self.qihao_num,
+            'result': self.result,
+            'number_sum': self.number_sum,
+            'opentime': self.opentime
+        }
+        if self.id is not None:
+            data['_id'] = self.id
+        if self.opentime_dt is not None:
+            data['opentime_dt'] = self.opentime_dt
+        if self.size is not None:
+            data['size'] = self.size
+        if self.odd_even is not None:
+            data['odd_even'] = self.odd_even
+
+        pattern = self._pattern_result()
+        if pattern:
+            data['pattern'] = pattern['name']
+            data['pattern_type'] = pattern['pattern']
+        if self.extreme_code != EXTREME_NONE:
+            data['extreme'] = EXTREME_RESULTS[self.extreme_code]['name']
+            data['extreme_type'] = EXTREME_RESULTS[self.extreme_code]['pattern']
+        if self.position_code != POSITION_NONE:
+            data['position'] = POSITION_RESULTS[self.position_code]['name']
+            data['position_type'] = POSITION_RESULTS[self.position_code]['pattern']
+        return data
+
+    def __repr__(self):
+        return f"Draw(qihao={self.qihao!r}, result={self.result!r}, number_sum={self.number_sum!r})"
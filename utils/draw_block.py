@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28开奖数据列式表示
+
+将开奖记录列表转换为NumPy数组（和值、大小、单双、形态及三个号码），
+统计和分析函数在数组上做向量化计算。
+"""
+
+import numpy as np
+
+# 缺失值编码
+MISSING = -1
+
+# 大小编码
+SIZE_SMALL = 0
+SIZE_BIG = 1
+SIZE_CODES = {'小': SIZE_SMALL, '大': SIZE_BIG}
+
+# 单双编码
+PARITY_EVEN = 0
+PARITY_ODD = 1
+PARITY_CODES = {'双': PARITY_EVEN, '单': PARITY_ODD}
+
+# 形态编码（缺少形态字段的记录按杂六统计）
+PATTERN_MIXED = 0
+PATTERN_PAIR = 1
+PATTERN_STRAIGHT = 2
+PATTERN_LEOPARD = 3
+PATTERN_CODES = {None: PATTERN_MIXED, '杂六': PATTERN_MIXED, '对子': PATTERN_PAIR, '顺子': PATTERN_STRAIGHT, '豹子': PATTERN_LEOPARD}
+
+def _parse_digits(result):
+    """从开奖结果字符串中解析三个号码，失败时返回缺失值"""
+    try:
+        parts = str(result).split('+')
+        if len(parts) == 3:
+            return int(parts[0]), int(parts[1]), int(parts[2])
+    except (TypeError, ValueError):
+        pass
+    return MISSING, MISSING, MISSING
+
+class DrawBlock:
+    """开奖数据的列式表示，数组顺序与输入记录一致（通常为最新一期在前）"""
+
+    __slots__ = ('sums', 'size', 'parity', 'pattern', 'digits')
+
+    def __init__(self, sums, size, parity, pattern, digits):
+        self.sums = sums
+        self.size = size
+        self.parity = parity
+        self.pattern = pattern
+        self.digits = digits
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        由开奖记录列表构建列式数据
+
+        Args:
+            records: 开奖记录（Draw对象）列表
+
+        Returns:
+            DrawBlock实例
+        """
+        count = len(records)
+        sums = np.full(count, MISSING, dtype=np.int8)
+        size = np.full(count, MISSING, dtype=np.int8)
+        parity = np.full(count, MISSING, dtype=np.int8)
+        pattern = np.full(count, MISSING, dtype=np.int8)
+        digits = np.full((count, 3), MISSING, dtype=np.int8)
+
+        for i, record in enumerate(records):
+            if record.number_sum is not None and 0 <= record.number_sum <= 27:
+                sums[i] = record.number_sum
+            size[i] = record.size_code
+            parity[i] = record.parity_code
+            pattern[i] = record.stats_pattern_code
+            digits[i] = _parse_digits(record.result)
+
+        return cls(sums, size, parity, pattern, digits)
+
+    def __len__(self):
+        return len(self.sums)
+
+    def combo_codes(self):
+        """
+        大小单双组合编码：大单、大双、小单、小双分别为 SIZE*2+PARITY，
+        大小或单双缺失时为MISSING
+        """
+        valid = (self.size != MISSING) & (self.parity != MISSING)
+        return np.where(valid, self.size * 2 + self.parity, MISSING).astype(np.int8)
+
+def count_codes(codes, length):
+    """统计编码数组中 0..length-1 各值出现的次数，忽略缺失值"""
+    return np.bincount(codes[(codes >= 0) & (codes < length)], minlength=length)
+
+def run_lengths(codes):
+    """
+    计算编码数组的连续段
+
+    Args:
+        codes: 编码数组
+
+    Returns:
+        (段的编码数组, 段长度数组)
+    """
+    count = len(codes)
+    if count == 0:
+        return codes[:0], np.zeros(0, dtype=np.int64)
+    change = np.empty(count, dtype=bool)
+    change[0] = True
+    np.not_equal(codes[1:], codes[:-1], out=change[1:])
+    starts = np.flatnonzero(change)
+    lengths = np.diff(np.append(starts, count))
+    return codes[starts], lengths
+
+def continuous_runs(codes, keys):
+    """
+    按数组顺序计算每种编码的最长连续段和最后一个连续段长度
+
+    Args:
+        codes: 编码数组（缺失值会打断连续段）
+        keys: 编码到统计键的映射，例如 {SIZE_BIG: 'big', SIZE_SMALL: 'small'}
+
+    Returns:
+        {统计键: {'max': 最长连续段, 'current': 最后一个连续段的长度或0}}
+    """
+    run_codes, lengths = run_lengths(codes)
+    result = {}
+    for code, key in keys.items():
+        matched = lengths[run_codes == code]
+        result[key] = {'max': int(matched.max()) if len(matched) else 0, 'current': 0}
+
+    valid = np.flatnonzero(run_codes != MISSING)
+    if len(valid):
+        last = valid[-1]
+        key = keys.get(int(run_codes[last]))
+        if key:
+            result[key]['current'] = int(lengths[last])
+    return result
+
+def ranked_counts(values):
+    """
+    按出现次数降序排列取值，次数相同时按首次出现的先后排列
+
+    Args:
+        values: 取值数组（按出现顺序）
+
+    Returns:
+        [(取值, 次数)] 列表
+    """
+    if len(values) == 0:
+        return []
+    unique, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.lexsort((first_index, -counts))
+    return [(int(unique[i]), int(counts[i])) for i in order]
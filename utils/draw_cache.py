@@ -0,0 +1,92 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RecentDrawCache:
+    """最近开奖记录的内存缓冲区（按数字期号降序保存，容量固定）"""
+
+    def __init__(self, capacity):
+        """
+        初始化缓冲区
+
+        Args:
+            capacity: 最多缓存的开奖记录数
+        """
+        self.capacity = capacity
+        self._records = []  # 按qihao_num降序排列，第一条为最新一期
+        self._lock = threading.Lock()
+        # 数据库记录数不超过容量时，缓冲区即为全部数据，超出范围的查询可直接返回空结果
+        self._complete = False
+        self.is_loaded = False
+
+    def load(self, records):
+        """
+        使用数据库中的最新记录重建缓冲区
+
+        Args:
+            records: 按期号降序排列的开奖记录（Draw对象）列表
+        """
+        with self._lock:
+            self._records = list(records[:self.capacity])
+            self._complete = len(records) < self.capacity
+            self.is_loaded = True
+        logger.info(f"开奖缓存已加载 {len(self._records)} 条记录")
+
+    def add(self, records):
+        """
+        合并新保存的开奖记录，期号相同的记录会被替换
+
+        Args:
+            records: 开奖记录（Draw对象）列表
+
+        Returns:
+            新加入缓冲区的记录列表（按期号降序）
+        """
+        if not records:
+            return []
+
+        with self._lock:
+            merged = {record.qihao_num: record for record in self._records}
+            added = []
+            for record in records:
+                qihao_num = record.qihao_num
+                if qihao_num is None:
+                    continue
+                if qihao_num not in merged:
+                    added.append(record)
+                merged[qihao_num] = record
+
+            ordered = sorted(merged.values(), key=lambda r: r.qihao_num, reverse=True)
+            if len(ordered) > self.capacity:
+                self._complete = False
+            self._records = ordered[:self.capacity]
+        added.sort(key=lambda r: r.qihao_num, reverse=True)
+        return added
+
+    def get_slice(self, skip, limit):
+        """
+        获取指定范围的开奖记录
+
+        Args:
+            skip: 跳过记录数
+            limit: 返回记录数量限制
+
+        Returns:
+            开奖记录列表（Draw对象与缓冲区共享，调用方不应修改），超出缓冲区范围时返回None（需回退到数据库查询）
+        """
+        with self._lock:
+            if not self.is_loaded:
+                return None
+            if skip + limit > len(self._records) and not self._complete:
+                return None
+            return self._records[skip:skip + limit]
+
+    def head_qihao_num(self):
+        """获取缓冲区中最新一期的数字期号，缓冲区为空时返回None"""
+        with self._lock:
+            return self._records[0].qihao_num if self._records else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
@@ -0,0 +1,61 @@
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DrawEventBroker:
+    """新开奖事件分发器，将新保存的开奖记录推送给所有SSE订阅者"""
+
+    def __init__(self, max_subscribers, queue_size=16):
+        """
+        初始化事件分发器
+
+        Args:
+            max_subscribers: 最大订阅者数量
+            queue_size: 每个订阅者的待发送事件队列长度
+        """
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """
+        新增订阅者
+
+        Returns:
+            订阅者的事件队列，订阅者已满时返回None
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        """移除订阅者"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        """
+        向所有订阅者推送事件
+
+        Args:
+            event: 已格式化的SSE消息文本
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # 客户端消费过慢时丢弃事件，连接重建后会收到最新一期
+                logger.warning("SSE订阅者事件队列已满，丢弃事件")
+
+    def subscriber_count(self):
+        """获取当前订阅者数量"""
+        with self._lock:
+            return len(self._subscribers)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28全量开奖历史的列式文件
+
+开奖记录按期号升序以定长二进制追加写入文件，读取时通过np.memmap映射为NumPy结构化数组，
+分析接口可以直接在全量历史上做向量化计算而无需从MongoDB逐条读取。
+"""
+
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from utils.draw_block import DrawBlock, MISSING
+from utils.draw import PATTERN_ABSENT
+from utils.pattern_analyzer import classify_digits, classify_sum
+
+try:
+    import fcntl
+except ImportError:  # 非POSIX系统上只在进程内加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 每期的定长记录：数字期号、开奖时间（1970-01-01起的秒数）、三个号码、和值及派生编码
+HISTORY_DTYPE = np.dtype([
+    ('qihao_num', '<i8'),
+    ('opentime', '<i8'),
+    ('digits', 'i1', (3,)),
+    ('sum', 'i1'),
+    ('size', 'i1'),
+    ('parity', 'i1'),
+    ('pattern', 'i1'),
+    ('extreme', 'i1'),
+    ('position', 'i1')
+])
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_history_row(record):
+    """
+    将开奖记录转换为历史文件中的一行
+
+    Args:
+        record: 开奖记录（Draw对象，需包含qihao_num）
+
+    Returns:
+        与HISTORY_DTYPE字段顺序一致的元组，缺失的字段为MISSING
+    """
+    opentime_dt = record.opentime_dt
+    opentime = int((opentime_dt.replace(tzinfo=None) - EPOCH).total_seconds()) if opentime_dt is not None else MISSING
+
+    try:
+        digits = tuple(int(part) for part in str(record.result).split('+'))
+        if len(digits) != 3 or not all(0 <= digit <= 9 for digit in digits):
+            raise ValueError
+    except ValueError:
+        digits = (MISSING, MISSING, MISSING)
+
+    number_sum = record.number_sum
+    if number_sum is None or not 0 <= number_sum <= 27:
+        number_sum = MISSING
+
+    if number_sum != MISSING:
+        size = 1 if number_sum > 13 else 0
+        parity = number_sum % 2
+        extreme, position = classify_sum(number_sum)
+    else:
+        size = parity = extreme = position = MISSING
+
+    # 优先使用记录中的形态字段，缺少时由号码判断
+    if record.pattern_code != PATTERN_ABSENT:
+        pattern = record.pattern_code
+    elif digits[0] != MISSING:
+        pattern = classify_digits(*digits)
+    else:
+        pattern = record.stats_pattern_code
+
+    return (record.qihao_num, opentime, digits, number_sum, size, parity, pattern, extreme, position)
+
+class HistoryStore:
+    """只追加的定长开奖历史文件"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: 历史文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows = np.zeros(0, dtype=HISTORY_DTYPE)
+        self._mapped_key = None  # 已映射文件的 (inode, 大小)
+        # 与数据库（含归档）核对过、覆盖全部历史后才为True，之前分析接口应从数据库读取
+        self.is_complete = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _remap(self):
+        """文件变化（本进程或其他进程追加、重建）时重新映射，末尾不完整的记录忽略"""
+        try:
+            stat = os.stat(self.path)
+            inode, file_size = stat.st_ino, stat.st_size
+        except OSError:
+            inode, file_size = None, 0
+        count = file_size // HISTORY_DTYPE.itemsize
+        key = (inode, count * HISTORY_DTYPE.itemsize)
+        if key == self._mapped_key:
+            return
+        # 旧的映射由仍在使用的数组引用保持，随引用释放而关闭
+        if count:
+            self._rows = np.memmap(self.path, dtype=HISTORY_DTYPE, mode='r', shape=(count,))
+        else:
+            self._rows = np.zeros(0, dtype=HISTORY_DTYPE)
+        self._mapped_key = key
+
+    def rows(self):
+        """
+        获取全部历史记录（按期号升序的只读结构化数组，不复制数据）
+        """
+        with self._lock:
+            self._remap()
+            return self._rows
+
+    def __len__(self):
+        return len(self.rows())
+
+    def _open_locked(self):
+        """打开文件并加文件锁；加锁期间文件被其他进程重建（替换）时重新打开新文件"""
+        while True:
+            f = open(self.path, 'ab')
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino:
+                    return f
+            except OSError:
+                pass
+            f.close()
+
+    @contextmanager
+    def _locked_file(self):
+        """以追加方式打开文件并加进程内锁和文件锁，期间其他进程的写入会等待"""
+        with self._lock:
+            f = self._open_locked()
+            try:
+                # 加锁后重新映射，其他进程可能已追加记录；丢弃上次写入中断留下的不完整记录
+                self._mapped_key = None
+                self._remap()
+                f.truncate(len(self._rows) * HISTORY_DTYPE.itemsize)
+                yield f
+                f.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                f.close()
+            self._remap()
+
+    def _write(self, f, records):
+        """在持有文件锁时写入比文件中最新一期更晚的记录，返回写入的记录数"""
+        last = int(self._rows['qihao_num'][-1]) if len(self._rows) else None
+        new_records = sorted(
+            (r for r in records if r.qihao_num is not None and (last is None or r.qihao_num > last)),
+            key=lambda r: r.qihao_num
+        )
+        if new_records:
+            f.write(np.array([to_history_row(r) for r in new_records], dtype=HISTORY_DTYPE).tobytes())
+        return len(new_records)
+
+    def append(self, records):
+        """
+        追加比文件中最新一期更晚的开奖记录
+
+        Args:
+            records: 开奖记录列表（任意顺序，需包含qihao_num）
+
+        Returns:
+            实际写入的记录数
+        """
+        with self._locked_file() as f:
+            return self._write(f, records)
+
+    def covers(self, first_qihao_num, count):
+        """
+        文件是否覆盖数据库（含归档）中的全部记录
+
+        Args:
+            first_qihao_num: 数据库中最早的数字期号，数据库为空时为None
+            count: 数据库中有数字期号的记录数
+
+        Returns:
+            文件从最早一期开始且记录数不少于数据库时返回True
+        """
+        return self._covers(self.rows(), first_qihao_num, count)
+
+    @staticmethod
+    def _covers(rows, first_qihao_num, count):
+        if first_qihao_num is None:
+            return True
+        return len(rows) >= count and int(rows['qihao_num'][0]) <= first_qihao_num
+
+    def sync(self, load_records, first_qihao_num, count):
+        """
+        将数据库中比文件更新的记录追加到文件，文件未覆盖数据库中的全部历史时重建文件
+
+        追加只读取比文件更新的少量记录，在文件锁内进行；重建时在锁外读取全部历史，
+        只在替换文件时持有锁。完成后标记为完整。
+
+        Args:
+            load_records: 返回按期号降序排列的开奖记录迭代器的函数（重建时会再次调用）
+            first_qihao_num: 数据库（含归档）中最早的数字期号
+            count: 数据库（含归档）中有数字期号的记录数
+
+        Returns:
+            写入的记录数
+        """
+        with self._locked_file() as f:
+            last = int(self._rows['qihao_num'][-1]) if len(self._rows) else None
+            pending = []
+            for record in load_records():
+                qihao_num = record.qihao_num
+                if qihao_num is None:
+                    continue
+                if last is not None and qihao_num <= last:
+                    break
+                pending.append(record)
+            count_written = self._write(f, pending)
+
+        if not self.covers(first_qihao_num, count):
+            count_written = self._rebuild(load_records, first_qihao_num, count)
+        self.is_complete = True
+        logger.info(f"开奖历史文件已同步，写入 {count_written} 期，共 {len(self)} 期")
+        return count_written
+
+    def _rebuild(self, load_records, first_qihao_num, count):
+        """由数据库中的全部记录重新生成文件，替换前再次检查（其他进程可能已完成重建）"""
+        logger.warning(f"开奖历史文件未覆盖全部 {count} 期（最早 {first_qihao_num}），重新生成")
+        rows = []
+        previous = None
+        for record in load_records():
+            if record.qihao_num is None or (previous is not None and record.qihao_num >= previous):
+                continue
+            previous = record.qihao_num
+            rows.append(to_history_row(record))
+        data = np.array(rows[::-1], dtype=HISTORY_DTYPE)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._locked_file():
+            if self._covers(self._rows, first_qihao_num, count):
+                return 0
+            # 读取期间追加的新记录
+            last = int(data['qihao_num'][-1]) if len(data) else None
+            if len(self._rows) and last is not None:
+                data = np.concatenate([data, self._rows[self._rows['qihao_num'] > last]])
+            with open(tmp_path, 'wb') as tmp:
+                tmp.write(data.tobytes())
+            # 等待锁的其他进程加锁后发现文件已替换，会重新打开新文件
+            os.replace(tmp_path, self.path)
+        return len(data)
+
+    def latest_block(self, limit):
+        """
+        获取最新limit期的列式数据（最新一期在前，为历史文件的视图）
+
+        Args:
+            limit: 期数
+
+        Returns:
+            DrawBlock实例，文件为空时返回None
+        """
+        rows = self.rows()
+        if not len(rows):
+            return None
+        recent = rows[-limit:][::-1]
+        return DrawBlock(recent['sum'], recent['size'], recent['parity'], recent['pattern'], recent['digits'])
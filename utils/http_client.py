@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+import config
+
+logger = logging.getLogger(__name__)
+
+class ConditionalHttpClient:
+    """带连接池的HTTP客户端，支持条件请求并识别未变化的响应内容"""
+
+    def __init__(self, pool_size=None):
+        """
+        初始化HTTP客户端
+
+        Args:
+            pool_size: 连接池大小，默认使用配置中的HTTP_POOL_SIZE
+        """
+        pool_size = pool_size or config.HTTP_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # 每个请求地址对应的缓存校验信息：etag、last_modified、digest
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(url, params):
+        if not params:
+            return url
+        query = '&'.join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{url}?{query}"
+
+    def get(self, url, params=None, timeout=None):
+        """
+        发送GET请求
+
+        Args:
+            url: 请求地址
+            params: 查询参数
+            timeout: 超时时间（秒）
+
+        Returns:
+            (response, changed) 元组。服务端返回304或响应内容与上次相同时，
+            response为None且changed为False
+
+        Raises:
+            requests.RequestException: 请求失败或返回错误状态码
+        """
+        key = self._make_key(url, params)
+        with self._lock:
+            validator = dict(self._validators.get(key, {}))
+
+        headers = {}
+        if validator.get('etag'):
+            headers['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            headers['If-Modified-Since'] = validator['last_modified']
+
+        response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            logger.debug(f"响应未修改(304): {key}")
+            return None, False
+        response.raise_for_status()
+
+        digest = hashlib.sha1(response.content).hexdigest()
+        with self._lock:
+            self._validators[key] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'digest': digest
+            }
+
+        if digest == validator.get('digest'):
+            logger.debug(f"响应内容未变化: {key}")
+            return None, False
+        return response, True
+
+    def forget(self, url, params=None):
+        """清除指定地址的缓存校验信息，下次请求将重新获取完整内容"""
+        with self._lock:
+            self._validators.pop(self._make_key(url, params), None)
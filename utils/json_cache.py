@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28预序列化JSON响应缓存
+
+访问量最大的接口在同一期开奖内返回相同的数据，响应体在第一次请求时序列化一次，
+gzip和brotli（已安装时）压缩结果在第一次被请求时生成并保存，之后按请求的Accept-Encoding直接返回。
+只有调用方指定的少量响应会被缓存，缓存键由调用方决定，不直接使用请求参数。
+安装了orjson时使用orjson序列化。
+"""
+
+import gzip
+import json
+import threading
+import logging
+
+try:
+    import orjson
+except ImportError:  # 未安装时使用标准库json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # 未安装时只提供gzip压缩
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 256
+
+# gzip和brotli的压缩级别（兼顾压缩率和首次请求的压缩耗时）
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+if orjson:
+    # datetime交给default处理，与Flask的JSON输出格式保持一致
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS |
+                      orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY)
+
+def encode_json(payload, default):
+    """
+    将数据序列化为紧凑的UTF-8 JSON字节串
+
+    Args:
+        payload: 响应数据
+        default: 处理无法直接序列化的对象的函数
+
+    Returns:
+        JSON字节串
+    """
+    if orjson:
+        return orjson.dumps(payload, default=default, option=ORJSON_OPTIONS)
+    return json.dumps(payload, default=default, ensure_ascii=False, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+class EncodedPayload:
+    """序列化后的响应体及其压缩版本（压缩结果在第一次被请求时生成）"""
+
+    __slots__ = ('raw', '_gzip', '_br')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._gzip = None
+        self._br = None
+
+    @property
+    def compressible(self):
+        """响应体是否足够大，值得压缩"""
+        return len(self.raw) >= MIN_COMPRESS_SIZE
+
+    def _gzip_body(self):
+        # 并发请求可能重复压缩一次，结果相同，不需要加锁
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.raw, GZIP_LEVEL)
+        return self._gzip
+
+    def _br_body(self):
+        if self._br is None:
+            self._br = brotli.compress(self.raw, quality=BROTLI_QUALITY)
+        return self._br
+
+    def select(self, accept_encodings):
+        """
+        按客户端支持的编码选择响应体
+
+        Args:
+            accept_encodings: 请求的Accept-Encoding（werkzeug的Accept对象）
+
+        Returns:
+            (响应体, Content-Encoding) 元组，不压缩时编码为None
+        """
+        if self.compressible:
+            if brotli and accept_encodings['br']:
+                return self._br_body(), 'br'
+            if accept_encodings['gzip']:
+                return self._gzip_body(), 'gzip'
+        return self.raw, None
+
+class JsonResponseCache:
+    """按开奖期号缓存的预序列化响应"""
+
+    def __init__(self, default, max_entries=64):
+        """
+        Args:
+            default: 序列化时处理无法直接序列化的对象的函数
+            max_entries: 最多缓存的响应数（调用方只缓存固定的几类响应，超出说明缓存键有误）
+        """
+        self.default = default
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """
+        获取缓存的响应
+
+        Args:
+            key: 缓存键，需包含决定响应内容的最新期号等信息
+
+        Returns:
+            EncodedPayload实例，不存在时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            self._stats['hits' if entry is not None else 'misses'] += 1
+            return entry
+
+    def put(self, key, payload):
+        """
+        序列化并缓存响应数据
+
+        Args:
+            key: 缓存键
+            payload: 响应数据
+
+        Returns:
+            EncodedPayload实例，缓存已满时不序列化并返回None（调用方按普通响应返回）
+        """
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                logger.warning(f"JSON响应缓存已满，不缓存: {key}")
+                return None
+        entry = EncodedPayload(encode_json(payload, self.default))
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self):
+        """清除全部缓存响应（保存新开奖后调用）"""
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def get_stats(self):
+        """获取缓存命中统计"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries),
+                        encoder='orjson' if orjson else 'json', brotli=brotli is not None)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28后台维护任务
+
+维护任务在后台线程中分批执行，进度保存在 lottery_meta 集合中，中断后可以继续；
+多个进程同时启动时通过 lottery_meta 中的锁文档保证只有一个进程执行。
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import config
+from utils.pattern_analyzer import pattern_fields
+
+logger = logging.getLogger(__name__)
+
+class MaintenanceLock:
+    """保存在 lottery_meta 集合中的跨进程锁，到期未续期的锁可被其他进程获取"""
+
+    def __init__(self, db, name, ttl=None):
+        """
+        Args:
+            db: MongoDB数据库对象
+            name: 锁名称
+            ttl: 锁的有效期（秒），默认使用配置中的MAINTENANCE_LOCK_TTL
+        """
+        self.collection = db.lottery_meta
+        self.lock_id = f"lock:{name}"
+        self.ttl = ttl or config.MAINTENANCE_LOCK_TTL
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self):
+        """
+        获取或续期锁
+
+        Returns:
+            是否持有锁
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.find_one_and_update(
+                {"_id": self.lock_id, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # 锁由其他进程持有且未到期
+            return False
+        except Exception as e:
+            logger.error(f"获取维护锁失败 ({self.lock_id}): {e}")
+            return False
+
+    def release(self):
+        """释放自己持有的锁"""
+        try:
+            self.collection.delete_one({"_id": self.lock_id, "owner": self.owner})
+        except Exception as e:
+            logger.error(f"释放维护锁失败 ({self.lock_id}): {e}")
+
+class RecordMigration:
+    """
+    lottery_results集合的后台分批迁移
+
+    按ORDER_FIELD升序分批更新待处理的记录，每批写入后在lottery_meta中保存检查点，中断后从检查点继续；
+    完成后清除检查点并记录完成时间（完成标记）。子类定义MIGRATION_ID、PENDING_QUERY和build_update。
+    """
+
+    MIGRATION_ID = None
+    # 待处理记录的查询条件
+    PENDING_QUERY = {}
+    # 分批和检查点使用的字段（升序、唯一）
+    ORDER_FIELD = '_id'
+    # 读取记录时的投影
+    PROJECTION = None
+    # 完成后不再执行；否则每次启动时检查是否有新的待处理记录
+    RUN_ONCE = False
+
+    def __init__(self, db):
+        """
+        Args:
+            db: MongoDB数据库对象
+        """
+        self.db = db
+        self.batch_size = config.MIGRATION_BATCH_SIZE
+        self.lock = MaintenanceLock(db, self.MIGRATION_ID)
+        self._status_lock = threading.Lock()
+        self._status = {
+            'state': 'idle',
+            'processed': 0,
+            'remaining': None,
+            'checkpoint': None,
+            'started_at': None,
+            'finished_at': None
+        }
+
+    def _update_status(self, **values):
+        with self._status_lock:
+            self._status.update(values)
+
+    def get_status(self):
+        """获取迁移进度"""
+        with self._status_lock:
+            return dict(self._status)
+
+    def build_update(self, record):
+        """
+        计算记录需要更新的字段
+
+        Args:
+            record: 按PROJECTION读取的记录
+
+        Returns:
+            $set的字段字典，不需要更新或无法处理时返回None
+        """
+        raise NotImplementedError
+
+    def pending_query(self, checkpoint=None):
+        query = dict(self.PENDING_QUERY)
+        if checkpoint is not None:
+            query[self.ORDER_FIELD] = {"$gt": checkpoint}
+        return query
+
+    def read_marker(self):
+        """
+        读取完成标记（最近一次完成迁移的时间）
+
+        Returns:
+            完成时间，从未完成或读取失败时返回None
+        """
+        try:
+            document = self.db.lottery_meta.find_one({"_id": self.MIGRATION_ID}, {"completed_at": 1})
+            return document.get('completed_at') if document else None
+        except Exception as e:
+            logger.error(f"读取迁移完成标记失败 ({self.MIGRATION_ID}): {e}")
+            return None
+
+    def is_done(self):
+        """是否已没有需要处理的记录"""
+        if self.RUN_ONCE:
+            return self.read_marker() is not None
+        return not self.db.lottery_results.find_one(self.pending_query(), {"_id": 1})
+
+    def run(self):
+        """
+        执行迁移，其他进程持有锁时等待，持有者异常退出或中断后锁到期即可接手
+
+        Raises:
+            迁移过程中的数据库错误
+        """
+        while not self.is_done():
+            if self.lock.acquire():
+                try:
+                    completed = self._migrate()
+                finally:
+                    self.lock.release()
+                if completed:
+                    return
+            else:
+                self._update_status(state='waiting')
+            time.sleep(self.lock.ttl / 2)
+        self._update_status(state='completed')
+
+    def _migrate(self):
+        """
+        从检查点开始分批更新，每批写入后保存检查点并续期维护锁
+
+        Returns:
+            是否完成（维护锁失效等原因中断时返回False）
+        """
+        meta = self.db.lottery_meta
+        checkpoint_doc = meta.find_one({"_id": self.MIGRATION_ID}) or {}
+        checkpoint = checkpoint_doc.get('checkpoint')
+        remaining = self.db.lottery_results.count_documents(self.pending_query(checkpoint))
+        self._update_status(state='running', remaining=remaining,
+                            checkpoint=None if checkpoint is None else str(checkpoint),
+                            started_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        logger.info(f"开始迁移 {self.MIGRATION_ID}，待处理 {remaining} 条记录，检查点: {checkpoint}")
+
+        count = 0
+        while True:
+            records = list(self.db.lottery_results.find(self.pending_query(checkpoint), self.PROJECTION)
+                           .sort(self.ORDER_FIELD, pymongo.ASCENDING).limit(self.batch_size))
+            if not records:
+                break
+
+            operations = []
+            for record in records:
+                fields = self.build_update(record)
+                if fields:
+                    operations.append(UpdateOne({"_id": record["_id"]}, {"$set": fields}))
+            modified = 0
+            if operations:
+                try:
+                    modified = self.db.lottery_results.bulk_write(operations, ordered=False).modified_count
+                except BulkWriteError as e:
+                    # 个别记录写入失败（如数字期号重复）时跳过这些记录，其余记录已写入
+                    modified = e.details.get('nModified', 0)
+                    logger.error(f"迁移 {self.MIGRATION_ID} 部分记录更新失败: {e.details.get('writeErrors', [])[:3]}")
+                count += modified
+
+            # 无法处理的记录仍满足待处理条件，由检查点跳过；实际更新的记录数累计到完成时
+            # （中断后由其他进程继续时也能知道之前是否更新过记录）
+            checkpoint = records[-1].get(self.ORDER_FIELD)
+            meta.update_one(
+                {"_id": self.MIGRATION_ID},
+                {"$set": {"checkpoint": checkpoint, "updated_at": datetime.now(timezone.utc)},
+                 "$inc": {"modified": modified}},
+                upsert=True
+            )
+            remaining = max(remaining - len(records), 0)
+            self._update_status(processed=count, remaining=remaining, checkpoint=str(checkpoint))
+
+            if checkpoint is None or not self.lock.acquire():
+                logger.warning(f"迁移 {self.MIGRATION_ID} 中断：检查点无效或维护锁已失效")
+                self._update_status(state='interrupted')
+                return False
+            time.sleep(config.MIGRATION_PAUSE_SECONDS)
+
+        # 完成后清除检查点，之后写入的待处理记录可以从头处理。只有确实更新了记录（或第一次完成）时
+        # 才更新完成标记，只剩重复或无法处理的记录时不会在每次启动时触发所有进程重新加载
+        modified = (meta.find_one({"_id": self.MIGRATION_ID}, {"modified": 1}) or {}).get('modified', 0)
+        fields = {"checkpoint": None, "modified": 0}
+        if modified > 0 or not checkpoint_doc.get('completed_at'):
+            fields.update(completed_at=datetime.now(timezone.utc), updated=modified)
+        meta.update_one({"_id": self.MIGRATION_ID}, {"$set": fields}, upsert=True)
+        self._update_status(state='completed', remaining=0, checkpoint=None,
+                            finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        logger.info(f"迁移 {self.MIGRATION_ID} 完成，更新了 {count} 条记录")
+        return True
+
+class PatternBackfill(RecordMigration):
+    """为缺少形态字段的历史记录按数字期号升序回填形态信息"""
+
+    MIGRATION_ID = 'pattern_backfill'
+    # 无法转换为数字期号的记录不参与排序和统计，不需要回填
+    PENDING_QUERY = {"pattern": {"$exists": False}, "qihao_num": {"$type": "number"}}
+    ORDER_FIELD = 'qihao_num'
+    PROJECTION = {"qihao": 1, "qihao_num": 1, "result": 1, "number_sum": 1}
+
+    def build_update(self, record):
+        if 'result' not in record or 'number_sum' not in record:
+            return None
+        try:
+            return pattern_fields(record['result'], record['number_sum'])
+        except Exception as e:
+            logger.error(f"分析记录形态失败 (期号: {record.get('qihao', '未知')}): {e}")
+            return None
+
+class MaintenanceRunner:
+    """
+    在后台线程中按顺序执行迁移（后面的迁移可以依赖前面迁移的结果）
+
+    创建时读取各迁移的完成标记，应在加载开奖数据之前创建；全部迁移结束后调用on_complete，
+    并告知是否有完成标记发生变化（本进程或其他进程完成了迁移，需要重新加载数据）。
+    """
+
+    def __init__(self, migrations):
+        """
+        Args:
+            migrations: 按执行顺序排列的RecordMigration实例列表
+        """
+        self.migrations = list(migrations)
+        self.loaded_markers = self._read_markers()
+        self.on_complete = None
+        self._thread = None
+
+    def _read_markers(self):
+        return [migration.read_marker() for migration in self.migrations]
+
+    def get_status(self):
+        """获取各迁移的进度"""
+        return {migration.MIGRATION_ID: migration.get_status() for migration in self.migrations}
+
+    def start(self, on_complete=None):
+        """
+        在后台线程中启动迁移
+
+        Args:
+            on_complete: 迁移结束后调用的函数，参数为完成标记是否发生变化
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self.on_complete = on_complete
+        self._thread = threading.Thread(target=self._run, name='maintenance', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for migration in self.migrations:
+            try:
+                migration.run()
+            except Exception as e:
+                logger.error(f"迁移 {migration.MIGRATION_ID} 失败: {e}")
+                migration._update_status(state='failed',
+                                         finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                # 后面的迁移依赖前面的结果，不再继续
+                break
+        self._finish()
+
+    def _finish(self):
+        markers = self._read_markers()
+        changed = markers != self.loaded_markers
+        if changed:
+            self.loaded_markers = markers
+            logger.info("后台迁移已完成，重新加载开奖数据")
+        if self.on_complete:
+            try:
+                self.on_complete(changed)
+            except Exception as e:
+                logger.error(f"迁移完成后的处理失败: {e}")
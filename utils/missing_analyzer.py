@@ -1,8 +1,12 @@
 import requests
 import json
+import copy
+import time
+import threading
 import logging
 import config
 import re
+from utils.http_client import ConditionalHttpClient
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +17,15 @@ class MissingAnalyzer:
         """初始化遗漏分析工具"""
         self.api_url = config.MISSING_API_URL
         self.timeout = config.MISSING_API_TIMEOUT
+        # 复用连接的HTTP客户端，响应未变化时直接返回上次解析结果
+        self.http = ConditionalHttpClient()
+        self._last_data = None
+        # 遗漏统计缓存：{'key': 最新期号, 'data': 统计数据, 'fetched_at': 获取时间}
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        # 正在进行的请求，并发调用共享同一次请求
+        self._inflight = None
+        self._cache_stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
     
     def get_missing_data(self):
         """
@@ -23,8 +36,14 @@ class MissingAnalyzer:
         """
         try:
             logger.info(f"请求遗漏分析数据: {self.api_url}")
-            response = requests.get(self.api_url, timeout=self.timeout)
-            response.raise_for_status()
+            response, changed = self.http.get(self.api_url, timeout=self.timeout)
+            if not changed and self._last_data is not None:
+                logger.debug("遗漏分析数据未变化，使用上次解析结果")
+                return self._last_data
+            if response is None:
+                # 内容未变化但没有可用的解析结果，重新获取完整响应
+                self.http.forget(self.api_url)
+                response, _ = self.http.get(self.api_url, timeout=self.timeout)
             
             # 提取有效的JSON部分
             response_text = response.text
@@ -40,13 +59,15 @@ class MissingAnalyzer:
             # 解析JSON数据
             try:
                 data = json.loads(valid_json)
-                return data
             except json.JSONDecodeError:
                 # 最后尝试移除所有HTML标签
                 clean_text = re.sub(r'<[^>]*>', '', response_text)
                 clean_text = clean_text.strip()
                 logger.info(f"尝试清理后的文本: {clean_text[:50]}...")
-                return json.loads(clean_text)
+                data = json.loads(clean_text)
+            
+            self._last_data = data
+            return data
             
         except requests.RequestException as e:
             logger.error(f"请求遗漏分析数据失败: {e}")
@@ -59,9 +80,80 @@ class MissingAnalyzer:
             logger.error(f"处理遗漏分析数据失败: {e}")
             return None
     
-    def get_missing_statistics(self):
+    def get_missing_statistics(self, draw_key=None):
+        """
+        获取结构化的遗漏统计数据（带缓存）
+        
+        缓存按最新期号和有效期判断是否新鲜；已有旧数据时直接返回旧数据并在后台刷新，
+        没有缓存时并发调用只发出一次请求，其余调用等待该请求完成。
+        
+        Args:
+            draw_key: 最新一期的期号，期号变化后缓存视为过期
+            
+        Returns:
+            包含分类统计的字典，获取失败则返回None
+        """
+        with self._cache_lock:
+            entry = self._cache
+            if (entry and entry['key'] == draw_key
+                    and time.monotonic() - entry['fetched_at'] < config.MISSING_CACHE_TTL):
+                self._cache_stats['hits'] += 1
+                return copy.deepcopy(entry['data'])
+            
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = threading.Event()
+            
+            if entry:
+                # 返回旧数据，由后台线程刷新
+                self._cache_stats['stale_hits'] += 1
+                if leader:
+                    threading.Thread(target=self._refresh_statistics, args=(draw_key, flight), daemon=True).start()
+                return copy.deepcopy(entry['data'])
+            
+            self._cache_stats['misses'] += 1
+        
+        if leader:
+            self._refresh_statistics(draw_key, flight)
+        else:
+            flight.wait(self.timeout)
+        
+        with self._cache_lock:
+            return copy.deepcopy(self._cache['data']) if self._cache else None
+    
+    def _refresh_statistics(self, draw_key, flight):
+        """请求遗漏统计数据并更新缓存，完成后唤醒等待的调用"""
+        try:
+            statistics = self._fetch_statistics()
+            with self._cache_lock:
+                self._cache_stats['refreshes'] += 1
+                if statistics:
+                    self._cache = {'key': draw_key, 'data': statistics, 'fetched_at': time.monotonic()}
+                else:
+                    # 请求失败时保留旧数据
+                    self._cache_stats['errors'] += 1
+        finally:
+            with self._cache_lock:
+                self._inflight = None
+            flight.set()
+    
+    def get_cache_stats(self):
+        """
+        获取缓存命中统计
+        
+        Returns:
+            包含命中、旧数据命中、未命中、刷新和失败次数的字典
+        """
+        with self._cache_lock:
+            stats = dict(self._cache_stats)
+            stats['cached_key'] = self._cache['key'] if self._cache else None
+            stats['refreshing'] = self._inflight is not None
+        return stats
+    
+    def _fetch_statistics(self):
         """
-        获取结构化的遗漏统计数据
+        请求并构建结构化的遗漏统计数据
         
         Returns:
             包含分类统计的字典
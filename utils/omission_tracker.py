@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28遗漏统计
+
+记录每个类型（大小单双、组合、极值、形态、和值）最近一次开出的序号，
+每保存一期新开奖只更新该期命中的类型，遗漏期数 = 最新序号 - 最近开出序号。
+"""
+
+import threading
+import logging
+from utils.pattern_analyzer import analyze_extreme_value
+from utils.draw_block import PATTERN_PAIR, PATTERN_STRAIGHT, PATTERN_LEOPARD
+
+logger = logging.getLogger(__name__)
+
+# 形态编码与遗漏键的对应关系（其他形态及缺少形态字段的记录按杂六统计）
+PATTERN_OMISSION_KEYS = {PATTERN_LEOPARD: 'bz', PATTERN_STRAIGHT: 'sz', PATTERN_PAIR: 'dz'}
+
+EXTREME_OMISSION_KEYS = {'max_extreme': 'jd', 'min_extreme': 'jx'}
+
+def _sum_keys(number_sum):
+    """和值命中的大小、单双、组合、极值和和值遗漏键"""
+    size = 'da' if number_sum > 13 else 'xiao'
+    odd_even = 'dan' if number_sum % 2 == 1 else 'shuang'
+    keys = [size, odd_even, size[0] + odd_even[0], f"s{number_sum}"]
+    extreme = analyze_extreme_value(number_sum)
+    if extreme:
+        keys.append(EXTREME_OMISSION_KEYS[extreme['pattern']])
+    return tuple(keys)
+
+# 每个和值命中的遗漏键，启动时按配置的极值范围计算一次
+SUM_OMISSION_KEYS = [_sum_keys(number_sum) for number_sum in range(28)]
+
+BASIC_KEYS = ('da', 'xiao', 'dan', 'shuang', 'dd', 'ds', 'xd', 'xs')
+PATTERN_KEYS = ('jd', 'jx', 'bz', 'sz', 'dz', 'zl')
+SUM_KEYS = tuple(f"s{i}" for i in range(28))
+
+def draw_omission_keys(record):
+    """
+    获取一期开奖命中的遗漏键
+
+    Args:
+        record: 开奖记录（Draw对象）
+
+    Returns:
+        命中的遗漏键列表，和值无效时只包含形态键
+    """
+    keys = [PATTERN_OMISSION_KEYS.get(record.pattern_code, 'zl')]
+    number_sum = record.number_sum
+    if number_sum is not None and 0 <= number_sum <= 27:
+        keys.extend(SUM_OMISSION_KEYS[number_sum])
+    return keys
+
+class OmissionTracker:
+    """基于本地开奖历史的遗漏统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_seen = {}  # 遗漏键 -> 最近一次开出的序号
+        self._seq = -1  # 最新一期的序号，序号从最早加载的一期开始递增
+        self.head_qihao_num = None
+        self.is_loaded = False
+
+    def load(self, records):
+        """
+        由最新到最旧遍历开奖记录重建遗漏状态，所有类型都已开出后停止遍历
+
+        Args:
+            records: 按期号降序排列的开奖记录（可以是数据库游标）
+
+        Returns:
+            遍历的期数
+        """
+        total_keys = len(BASIC_KEYS) + len(PATTERN_KEYS) + len(SUM_KEYS)
+        found = {}  # 遗漏键 -> 距最新一期的期数
+        head_qihao_num = None
+        scanned = 0
+        for record in records:
+            if head_qihao_num is None:
+                head_qihao_num = record.qihao_num
+            for key in draw_omission_keys(record):
+                found.setdefault(key, scanned)
+            scanned += 1
+            if len(found) == total_keys:
+                break
+
+        with self._lock:
+            # 最新一期的序号取遍历期数，从未开出的类型遗漏期数即为遍历期数
+            self._seq = scanned
+            self._last_seen = {key: scanned - distance for key, distance in found.items()}
+            self.head_qihao_num = head_qihao_num
+            self.is_loaded = True
+        logger.info(f"遗漏统计已加载，遍历 {scanned} 期数据")
+        return scanned
+
+    def add_draws(self, records):
+        """
+        加入新开奖记录
+
+        Args:
+            records: 新开奖记录列表（按期号降序）
+
+        Returns:
+            是否成功增量更新；记录不晚于当前最新一期时返回False，需要调用load重建
+        """
+        with self._lock:
+            if not self.is_loaded:
+                return False
+            ordered = sorted(records, key=lambda r: r.qihao_num)
+            if self.head_qihao_num is not None and ordered[0].qihao_num <= self.head_qihao_num:
+                return False
+            for record in ordered:
+                self._seq += 1
+                for key in draw_omission_keys(record):
+                    self._last_seen[key] = self._seq
+                self.head_qihao_num = record.qihao_num
+            return True
+
+    def _omission(self, key):
+        # 从未开出的类型按已统计的全部期数计算
+        return self._seq - self._last_seen.get(key, 0)
+
+    def get_statistics(self):
+        """
+        获取结构化的遗漏统计数据，结构与 MissingAnalyzer.get_missing_statistics 一致
+
+        Returns:
+            包含分类统计的字典，未加载时返回None
+        """
+        with self._lock:
+            if not self.is_loaded:
+                return None
+            return {
+                'basic': {key: self._omission(key) for key in BASIC_KEYS},
+                'pattern': {key: self._omission(key) for key in PATTERN_KEYS},
+                'sum': {key: self._omission(key) for key in SUM_KEYS}
+            }
+
+    def compare(self, statistics):
+        """
+        与外部遗漏统计数据核对
+
+        Args:
+            statistics: get_missing_statistics 返回的结构
+
+        Returns:
+            [(遗漏键, 本地值, 外部值)] 不一致的条目列表
+        """
+        local = self.get_statistics()
+        if not local or not statistics:
+            return []
+        mismatches = []
+        for group, values in local.items():
+            remote_values = statistics.get(group) or {}
+            for key, value in values.items():
+                if key not in remote_values:
+                    continue
+                try:
+                    remote_value = int(remote_values[key])
+                except (TypeError, ValueError):
+                    continue
+                if remote_value != value:
+                    mismatches.append((key, value, remote_value))
+        return mismatches
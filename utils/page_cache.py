@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28页面渲染缓存
+
+首页和历史记录页前几页的HTML只在新开奖或网站配置修改后变化，
+渲染结果按（路由、页码、最新期号、配置版本）缓存，失效后在下一次请求时重新渲染。
+"""
+
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PageCache:
+    """已渲染页面的内存缓存"""
+
+    def __init__(self, max_page):
+        """
+        Args:
+            max_page: 缓存的最大页码，更后面的页面每次直接渲染
+        """
+        self.max_page = max_page
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._config_version = 0
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get_or_render(self, route, page, latest_qihao, render):
+        """
+        获取缓存的页面，不存在时渲染并缓存
+
+        Args:
+            route: 路由名称
+            page: 页码
+            latest_qihao: 最新一期期号
+            render: 渲染页面的函数，返回HTML字符串
+
+        Returns:
+            页面HTML
+        """
+        if not 1 <= page <= self.max_page or latest_qihao is None:
+            return render()
+
+        with self._lock:
+            key = (route, page, latest_qihao, self._config_version)
+            html = self._pages.get(key)
+            if html is not None:
+                self._stats['hits'] += 1
+                return html
+            self._stats['misses'] += 1
+
+        html = render()
+        with self._lock:
+            # 渲染期间缓存已失效时不再保存旧版本的页面
+            if key[3] == self._config_version:
+                self._pages[key] = html
+        return html
+
+    def invalidate(self):
+        """清除全部缓存页面（保存新开奖后调用）"""
+        with self._lock:
+            self._pages.clear()
+            self._stats['invalidations'] += 1
+
+    def bump_config_version(self):
+        """网站配置修改后递增配置版本并清除缓存页面"""
+        with self._lock:
+            self._config_version += 1
+            self._pages.clear()
+            self._stats['invalidations'] += 1
+        logger.info(f"页面缓存已失效，配置版本: {self._config_version}")
+
+    def get_stats(self):
+        """获取缓存命中统计"""
+        with self._lock:
+            return dict(self._stats, pages=len(self._pages), config_version=self._config_version)
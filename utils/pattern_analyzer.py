@@ -3,10 +3,48 @@
 
 """
 PC28号码形态分析工具
+
+三个号码只有1000种组合、和值只有28种，导入时预先计算每种组合的形态编码和
+每个和值的极值、中边编码，分析时直接查表。
 """
 
 from config import PATTERN_TYPES
 
+# 基本形态编码
+BASIC_MIXED = 0
+BASIC_PAIR = 1
+BASIC_STRAIGHT = 2
+BASIC_LEOPARD = 3
+
+# 极值编码（不属于极值时为EXTREME_NONE）
+EXTREME_NONE = -1
+EXTREME_MIN = 0
+EXTREME_MAX = 1
+
+# 中边编码（不属于任何范围时为POSITION_NONE）
+POSITION_NONE = -1
+POSITION_SMALL_EDGE = 0
+POSITION_MIDDLE = 1
+POSITION_BIG_EDGE = 2
+
+BASIC_RESULTS = (
+    {'pattern': 'mixed', 'name': '杂六'},
+    {'pattern': 'pair', 'name': '对子'},
+    {'pattern': 'straight', 'name': '顺子'},
+    {'pattern': 'leopard', 'name': '豹子'}
+)
+
+EXTREME_RESULTS = (
+    {'pattern': 'min_extreme', 'name': '极小'},
+    {'pattern': 'max_extreme', 'name': '极大'}
+)
+
+POSITION_RESULTS = (
+    {'pattern': 'small_edge', 'name': '小边'},
+    {'pattern': 'middle', 'name': '中数'},
+    {'pattern': 'big_edge', 'name': '大边'}
+)
+
 def get_numbers_from_result(result_str):
     """从开奖结果字符串中提取数字列表"""
     try:
@@ -20,91 +58,143 @@ def get_numbers_from_result(result_str):
     except:
         return []
 
-def analyze_basic_pattern(numbers):
-    """
-    分析号码的基本形态（对子、顺子、豹子、杂六）
-    
-    参数:
-        numbers: 号码列表，例如 [1, 2, 3]
-        
-    返回:
-        dict: 包含形态分析结果的字典
-    """
+def _basic_pattern_code(numbers):
+    """按排序后的号码判断基本形态编码"""
     if not numbers or len(numbers) != 3:
-        return {'pattern': 'mixed', 'name': '杂六'}
+        return BASIC_MIXED
     
     # 将号码排序
     sorted_nums = sorted(numbers)
     
     # 检查是否为豹子（三个数字完全相同）
     if sorted_nums[0] == sorted_nums[1] == sorted_nums[2]:
-        return {'pattern': 'leopard', 'name': '豹子'}
+        return BASIC_LEOPARD
     
     # 检查是否为对子（两个数字相同）
     if (sorted_nums[0] == sorted_nums[1] or 
         sorted_nums[1] == sorted_nums[2] or 
         sorted_nums[0] == sorted_nums[2]):
-        return {'pattern': 'pair', 'name': '对子'}
+        return BASIC_PAIR
     
     # 检查是否为顺子（三个连续数字）
     if sorted_nums[0] + 1 == sorted_nums[1] and sorted_nums[1] + 1 == sorted_nums[2]:
-        return {'pattern': 'straight', 'name': '顺子'}
+        return BASIC_STRAIGHT
     
     # 默认为杂六
-    return {'pattern': 'mixed', 'name': '杂六'}
+    return BASIC_MIXED
 
-def analyze_extreme_value(sum_value):
-    """
-    分析号码和值的极值情况（极大、极小）
-    
-    参数:
-        sum_value: 号码和值
-        
-    返回:
-        dict: 包含极值分析结果的字典，若不符合极值条件则返回None
-    """
+def _extreme_code(sum_value):
+    """按配置的范围判断极值编码"""
     extreme_types = PATTERN_TYPES['EXTREME']['types']
     
     # 检查极小
     min_range = extreme_types['MIN_EXTREME']['range']
     if min_range[0] <= sum_value <= min_range[1]:
-        return {'pattern': 'min_extreme', 'name': '极小'}
+        return EXTREME_MIN
     
     # 检查极大
     max_range = extreme_types['MAX_EXTREME']['range']
     if max_range[0] <= sum_value <= max_range[1]:
-        return {'pattern': 'max_extreme', 'name': '极大'}
+        return EXTREME_MAX
     
-    return None
+    return EXTREME_NONE
 
-def analyze_position(sum_value):
+def _position_code(sum_value):
+    """按配置的范围判断中边编码"""
+    position_types = PATTERN_TYPES['POSITION']['types']
+    
+    for key, code in (('SMALL_EDGE', POSITION_SMALL_EDGE), ('MIDDLE', POSITION_MIDDLE), ('BIG_EDGE', POSITION_BIG_EDGE)):
+        value_range = position_types[key]['range']
+        if value_range[0] <= sum_value <= value_range[1]:
+            return code
+    
+    return POSITION_NONE
+
+# 三个号码（各0-9）的形态编码表，下标为 a*100 + b*10 + c
+BASIC_PATTERN_TABLE = tuple(
+    _basic_pattern_code((index // 100, index // 10 % 10, index % 10))
+    for index in range(1000)
+)
+
+# 开奖结果字符串（如 "1+2+3"）到号码和形态编码的对应表
+RESULT_TABLE = {
+    f"{index // 100}+{index // 10 % 10}+{index % 10}": (
+        (index // 100, index // 10 % 10, index % 10), BASIC_PATTERN_TABLE[index]
+    )
+    for index in range(1000)
+}
+
+# 和值0-27的极值、中边编码表
+EXTREME_TABLE = tuple(_extreme_code(sum_value) for sum_value in range(28))
+POSITION_TABLE = tuple(_position_code(sum_value) for sum_value in range(28))
+
+def classify_digits(a, b, c):
     """
-    分析号码和值的中边情况（小边、中数、大边）
+    查表获取三个号码的基本形态编码
     
     参数:
-        sum_value: 号码和值
+        a, b, c: 三个号码
         
     返回:
-        dict: 包含中边分析结果的字典
+        int: 基本形态编码（BASIC_*）
     """
-    position_types = PATTERN_TYPES['POSITION']['types']
+    if 0 <= a <= 9 and 0 <= b <= 9 and 0 <= c <= 9:
+        return BASIC_PATTERN_TABLE[a * 100 + b * 10 + c]
+    return _basic_pattern_code((a, b, c))
+
+def classify_sum(sum_value):
+    """
+    查表获取和值的极值和中边编码
     
-    # 检查小边
-    small_range = position_types['SMALL_EDGE']['range']
-    if small_range[0] <= sum_value <= small_range[1]:
-        return {'pattern': 'small_edge', 'name': '小边'}
+    参数:
+        sum_value: 号码和值
+        
+    返回:
+        tuple: (极值编码, 中边编码)
+    """
+    if 0 <= sum_value <= 27:
+        return EXTREME_TABLE[sum_value], POSITION_TABLE[sum_value]
+    return _extreme_code(sum_value), _position_code(sum_value)
+
+def analyze_basic_pattern(numbers):
+    """
+    分析号码的基本形态（对子、顺子、豹子、杂六）
     
-    # 检查中数
-    middle_range = position_types['MIDDLE']['range']
-    if middle_range[0] <= sum_value <= middle_range[1]:
-        return {'pattern': 'middle', 'name': '中数'}
+    参数:
+        numbers: 号码列表，例如 [1, 2, 3]
+        
+    返回:
+        dict: 包含形态分析结果的字典
+    """
+    if not numbers or len(numbers) != 3:
+        return dict(BASIC_RESULTS[BASIC_MIXED])
+    return dict(BASIC_RESULTS[classify_digits(*numbers)])
+
+def analyze_extreme_value(sum_value):
+    """
+    分析号码和值的极值情况（极大、极小）
     
-    # 检查大边
-    big_range = position_types['BIG_EDGE']['range']
-    if big_range[0] <= sum_value <= big_range[1]:
-        return {'pattern': 'big_edge', 'name': '大边'}
+    参数:
+        sum_value: 号码和值
+        
+    返回:
+        dict: 包含极值分析结果的字典，若不符合极值条件则返回None
+    """
+    code = classify_sum(sum_value)[0]
+    return dict(EXTREME_RESULTS[code]) if code != EXTREME_NONE else None
+
+def analyze_position(sum_value):
+    """
+    分析号码和值的中边情况（小边、中数、大边）
     
-    return None
+    参数:
+        sum_value: 号码和值
+        
+    返回:
+        dict: 包含中边分析结果的字典
+    """
+    code = classify_sum(sum_value)[1]
+    return dict(POSITION_RESULTS[code]) if code != POSITION_NONE else None
 
 def analyze_lottery_result(result, number_sum=None):
     """
@@ -117,24 +207,58 @@ def analyze_lottery_result(result, number_sum=None):
     返回:
         dict: 包含所有形态分析结果的字典
     """
-    numbers = get_numbers_from_result(result)
-    if not numbers:
-        return {
-            'basic': {'pattern': 'unknown', 'name': '未知'},
-            'extreme': None,
-            'position': None
-        }
+    # 标准格式的开奖结果直接查表，其他格式再解析号码
+    entry = RESULT_TABLE.get(result) if isinstance(result, str) else None
+    if entry:
+        numbers, basic_code = entry
+    else:
+        numbers = get_numbers_from_result(result)
+        if not numbers:
+            return {
+                'basic': {'pattern': 'unknown', 'name': '未知'},
+                'extreme': None,
+                'position': None
+            }
+        basic_code = classify_digits(*numbers) if len(numbers) == 3 else BASIC_MIXED
     
     # 如果和值未提供，则计算和值
     sum_value = number_sum if number_sum is not None else sum(numbers)
     
     # 分析各种形态
-    basic_pattern = analyze_basic_pattern(numbers)
-    extreme_value = analyze_extreme_value(sum_value)
-    position = analyze_position(sum_value)
+    extreme_code, position_code = classify_sum(sum_value)
     
     return {
-        'basic': basic_pattern,
-        'extreme': extreme_value,
-        'position': position
-    } 
\ No newline at end of file
+        'basic': dict(BASIC_RESULTS[basic_code]),
+        'extreme': dict(EXTREME_RESULTS[extreme_code]) if extreme_code != EXTREME_NONE else None,
+        'position': dict(POSITION_RESULTS[position_code]) if position_code != POSITION_NONE else None
+    }
+
+
+def pattern_fields(result, number_sum):
+    """
+    生成开奖记录中保存的形态字段
+    
+    参数:
+        result: 开奖结果字符串，例如 "1+2+3"
+        number_sum: 和值
+        
+    返回:
+        dict: 形态、极值和中边字段（pattern、pattern_type、extreme、extreme_type、position、position_type）
+    """
+    pattern_analysis = analyze_lottery_result(result, int(number_sum))
+    # 只保存基本形态（对子、顺子、豹子、杂六）
+    fields = {
+        'pattern': pattern_analysis['basic']['name'],
+        'pattern_type': pattern_analysis['basic']['pattern']
+    }
+    
+    # 保存极值和中边信息
+    if pattern_analysis['extreme']:
+        fields['extreme'] = pattern_analysis['extreme']['name']
+        fields['extreme_type'] = pattern_analysis['extreme']['pattern']
+    
+    if pattern_analysis['position']:
+        fields['position'] = pattern_analysis['position']['name']
+        fields['position_type'] = pattern_analysis['position']['pattern']
+    
+    return fields
@@ -1,14 +1,18 @@
 import threading
-import time
 import logging
-import schedule
-from datetime import datetime
+import statistics
+from datetime import datetime, timedelta
 import config
 
 logger = logging.getLogger(__name__)
 
 class LotteryScheduler:
-    """开奖数据定时抓取任务调度器"""
+    """
+    开奖数据定时抓取任务调度器
+    
+    根据最近的开奖时间估算开奖周期：在预计开奖前休眠，开奖窗口内快速轮询，
+    开奖延迟时按指数退避降低请求频率。
+    """
     
     def __init__(self, api_client, db_manager):
         """
@@ -23,6 +27,12 @@ class LotteryScheduler:
         self.thread = None
         self.is_running = False
         self.last_update_time = None
+        self.last_save_summary = None
+        self._stop_event = threading.Event()
+        # 开奖窗口结束后仍未获取到新开奖的连续请求次数，用于指数退避
+        self._late_polls = 0
+        self.draw_interval = config.LOTTERY_INTERVAL
+        self.next_fetch_time = None
     
     def start(self):
         """启动调度器"""
@@ -33,16 +43,14 @@ class LotteryScheduler:
         # 立即执行一次数据获取
         self.fetch_and_save_data()
         
-        # 设置定时任务，使用配置中的更新间隔
-        schedule.every(config.DATA_UPDATE_INTERVAL).seconds.do(self.fetch_and_save_data)
-        
         # 创建并启动线程
         self.is_running = True
+        self._stop_event.clear()
         self.thread = threading.Thread(target=self._run_scheduler)
         self.thread.daemon = True  # 设为守护线程，主线程结束时自动结束
         self.thread.start()
         
-        logger.info(f"开奖数据调度器已启动，更新间隔：{config.DATA_UPDATE_INTERVAL}秒")
+        logger.info(f"开奖数据调度器已启动，开奖窗口内轮询间隔：{config.DATA_UPDATE_INTERVAL}秒")
         return True
     
     def stop(self):
@@ -52,7 +60,7 @@ class LotteryScheduler:
             return False
         
         self.is_running = False
-        schedule.clear()
+        self._stop_event.set()
         
         if self.thread:
             self.thread.join(timeout=2.0)
@@ -64,26 +72,94 @@ class LotteryScheduler:
     def _run_scheduler(self):
         """运行调度器循环"""
         while self.is_running:
-            schedule.run_pending()
-            time.sleep(1)
+            delay = self._next_delay()
+            self.next_fetch_time = datetime.now() + timedelta(seconds=delay)
+            if self._stop_event.wait(delay):
+                break
+            self.fetch_and_save_data()
+    
+    def _estimate_draw_schedule(self):
+        """
+        根据最近的开奖时间估算开奖周期
+        
+        Returns:
+            (最新一期开奖时间, 开奖间隔秒数) 元组，无可用数据时开奖时间为None
+        """
+        records = self.db_manager.get_latest_results(limit=config.CADENCE_SAMPLE_SIZE, profile='stats')
+        times = [r.opentime_dt for r in records if r.opentime_dt is not None]
+        if not times:
+            return None, config.LOTTERY_INTERVAL
+        
+        # 只采用与配置间隔相近的相邻间隔，排除停机等造成的断档
+        gaps = [
+            (newer - older).total_seconds()
+            for newer, older in zip(times, times[1:])
+            if config.LOTTERY_INTERVAL / 2 <= (newer - older).total_seconds() <= config.LOTTERY_INTERVAL * 2
+        ]
+        interval = statistics.median(gaps) if gaps else config.LOTTERY_INTERVAL
+        return times[0], interval
+    
+    def _next_delay(self):
+        """
+        计算距下一次请求的等待秒数
+        
+        Returns:
+            等待秒数
+        """
+        try:
+            latest_time, self.draw_interval = self._estimate_draw_schedule()
+        except Exception as e:
+            logger.error(f"估算开奖周期失败: {e}")
+            latest_time = None
+        
+        fast_interval = config.DATA_UPDATE_INTERVAL
+        if latest_time is None:
+            return fast_interval
+        
+        expected = latest_time + timedelta(seconds=self.draw_interval)
+        until_expected = (expected - datetime.now()).total_seconds()
+        
+        # 最新开奖时间晚于当前时间（上游时钟或时区偏差、年份错误）：预计时间不可信，快速轮询
+        if until_expected > self.draw_interval:
+            return fast_interval
+        
+        # 距预计开奖还早：休眠到开奖前FETCH_LEAD_SECONDS
+        if until_expected > config.FETCH_LEAD_SECONDS:
+            return min(until_expected - config.FETCH_LEAD_SECONDS, self.draw_interval)
+        
+        # 开奖窗口内：快速轮询
+        if -until_expected <= config.FETCH_WINDOW_SECONDS:
+            return fast_interval
+        
+        # 开奖延迟：指数退避
+        delay = min(fast_interval * (2 ** self._late_polls), config.FETCH_BACKOFF_MAX_SECONDS)
+        self._late_polls += 1
+        return delay
     
     def fetch_and_save_data(self):
         """从API获取数据并保存到数据库"""
         try:
+            # 以数据库中的最大期号作为水位线，只获取新数据
+            self.api_client.set_watermark(self.db_manager.get_high_water_mark())
+            
             # 从第一页开始获取数据
             results = self.api_client.get_lottery_results(page=1)
             
             if results:
                 # 保存到数据库
-                saved_count = self.db_manager.save_lottery_results(results)
+                summary = self.db_manager.save_lottery_results(results)
+                self.last_save_summary = summary
+                
+                if summary['inserted'] > 0:
+                    self._late_polls = 0
                 
-                if saved_count > 0:
-                    logger.info(f"成功更新 {saved_count} 条开奖记录")
+                if summary['inserted'] > 0 or summary['modified'] > 0:
+                    logger.info(f"成功更新开奖记录: 新增 {summary['inserted']} 条, 更新 {summary['modified']} 条, 跳过 {summary['skipped']} 条")
                     self.last_update_time = datetime.now()
                 else:
                     logger.info("没有新的开奖记录需要更新")
             else:
-                logger.warning("从API获取数据为空")
+                logger.debug("没有新的开奖数据")
                 
             return True
         except Exception as e:
@@ -96,5 +172,8 @@ class LotteryScheduler:
             "is_running": self.is_running,
             "last_update": self.last_update_time.strftime("%Y-%m-%d %H:%M:%S") if self.last_update_time else None,
             "total_records": self.db_manager.count_lottery_results(),
-            "update_interval": config.DATA_UPDATE_INTERVAL
+            "last_save": self.last_save_summary,
+            "update_interval": config.DATA_UPDATE_INTERVAL,
+            "draw_interval": self.draw_interval,
+            "next_fetch": self.next_fetch_time.strftime("%Y-%m-%d %H:%M:%S") if self.next_fetch_time else None
         } 
\ No newline at end of file
@@ -0,0 +1,525 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PC28滑动窗口统计引擎
+
+为固定的统计期数窗口维护计数、连续段状态和和值转移表。每保存一期新开奖，
+各窗口加入最新一期并移除离开窗口的一期，/api/stats 和 /api/number_analysis
+直接读取结果。
+"""
+
+import threading
+import logging
+from collections import deque
+import numpy as np
+from utils.draw_block import (
+    SIZE_SMALL, SIZE_BIG, PARITY_EVEN, PARITY_ODD,
+    PATTERN_MIXED, PATTERN_PAIR, PATTERN_STRAIGHT, PATTERN_LEOPARD
+)
+
+logger = logging.getLogger(__name__)
+
+# 形态编码与统计键的对应关系（缺少形态字段的记录按杂六统计）
+PATTERN_KEYS = {
+    PATTERN_MIXED: 'mixed',
+    PATTERN_PAIR: 'pair',
+    PATTERN_STRAIGHT: 'straight',
+    PATTERN_LEOPARD: 'triple'
+}
+
+SIZE_KEYS = {SIZE_BIG: 'big', SIZE_SMALL: 'small'}
+ODD_EVEN_KEYS = {PARITY_ODD: 'odd', PARITY_EVEN: 'even'}
+
+def draw_codes(record):
+    """
+    提取统计所需的开奖字段
+
+    Args:
+        record: 开奖记录（Draw对象）
+
+    Returns:
+        (和值, 大小键, 单双键, 组合键, 形态键) 元组，缺失的字段为None
+    """
+    size = SIZE_KEYS.get(record.size_code)
+    odd_even = ODD_EVEN_KEYS.get(record.parity_code)
+    combo = f"{size}_{odd_even}" if size and odd_even else None
+    pattern = PATTERN_KEYS.get(record.stats_pattern_code)
+    return record.number_sum, size, odd_even, combo, pattern
+
+def count_entry(count, total):
+    """生成统计接口使用的 {count, percentage} 结构"""
+    return {
+        'count': count,
+        'percentage': round(count / total * 100, 1) if total > 0 else 0
+    }
+
+class RunTracker:
+    """
+    一组互斥类型（如大/小）的连续段状态
+
+    连续段按从旧到新的顺序保存，可以在最新端追加、在最旧端移除。
+    类型为None的记录会打断连续段。
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.runs = deque()  # [类型, 长度]，从最旧到最新
+        # 每种类型的连续段长度分布：{长度: 段数}
+        self.length_counts = {key: {} for key in keys}
+
+    def _change_length(self, key, old_length, new_length):
+        if key is None:
+            return
+        counts = self.length_counts[key]
+        if old_length:
+            counts[old_length] -= 1
+            if not counts[old_length]:
+                del counts[old_length]
+        if new_length:
+            counts[new_length] = counts.get(new_length, 0) + 1
+
+    def push(self, key):
+        """在最新端追加一期"""
+        if self.runs and self.runs[-1][0] == key:
+            run = self.runs[-1]
+            self._change_length(key, run[1], run[1] + 1)
+            run[1] += 1
+        else:
+            self.runs.append([key, 1])
+            self._change_length(key, 0, 1)
+
+    def pop(self):
+        """从最旧端移除一期"""
+        run = self.runs[0]
+        self._change_length(run[0], run[1], run[1] - 1)
+        run[1] -= 1
+        if not run[1]:
+            self.runs.popleft()
+
+    def to_list(self):
+        """导出连续段列表 [[类型, 长度], ...]（从最旧到最新），用于保存"""
+        return [list(run) for run in self.runs]
+
+    @classmethod
+    def from_list(cls, keys, runs):
+        """
+        由to_list导出的连续段恢复
+
+        Args:
+            keys: 互斥类型
+            runs: 连续段列表
+
+        Returns:
+            RunTracker实例
+        """
+        tracker = cls(keys)
+        for key, length in runs:
+            tracker.runs.append([key, length])
+            tracker._change_length(key, 0, length)
+        return tracker
+
+    def to_payload(self):
+        """
+        生成连续统计结果
+
+        max为窗口内该类型的最长连续段；current与按最新到最旧遍历的
+        结果一致，即最旧一个连续段的长度。
+        """
+        payload = {
+            key: {'max': max(self.length_counts[key]) if self.length_counts[key] else 0, 'current': 0}
+            for key in self.keys
+        }
+        for key, length in self.runs:
+            if key is not None:
+                payload[key]['current'] = length
+                break
+        return payload
+
+class WindowStats:
+    """单个统计窗口的计数和连续段状态"""
+
+    COMBO_KEYS = ('big_odd', 'big_even', 'small_odd', 'small_even')
+
+    def __init__(self, size=None):
+        """
+        Args:
+            size: 窗口期数，None表示不限期数
+        """
+        self.size = size
+        self.total = 0
+        self.basic = {'big': 0, 'small': 0, 'odd': 0, 'even': 0}
+        self.combos = {key: 0 for key in self.COMBO_KEYS}
+        self.sums = [0] * 28
+        self.patterns = {'mixed': 0, 'pair': 0, 'straight': 0, 'triple': 0}
+        self.extremes = {'extreme_small': 0, 'extreme_big': 0, 'middle': 0}
+        self.size_runs = RunTracker(('big', 'small'))
+        self.odd_even_runs = RunTracker(('odd', 'even'))
+        self.combo_runs = RunTracker(self.COMBO_KEYS)
+
+    def _apply(self, codes, delta):
+        number_sum, size, odd_even, combo, pattern = codes
+        self.total += delta
+        if size:
+            self.basic[size] += delta
+        if odd_even:
+            self.basic[odd_even] += delta
+        if combo:
+            self.combos[combo] += delta
+        if pattern:
+            self.patterns[pattern] += delta
+        if number_sum is not None:
+            if 0 <= number_sum <= 27:
+                self.sums[number_sum] += delta
+            if number_sum <= 5:
+                self.extremes['extreme_small'] += delta
+            elif number_sum >= 22:
+                self.extremes['extreme_big'] += delta
+            else:
+                self.extremes['middle'] += delta
+
+    def add(self, codes):
+        """加入最新一期"""
+        self._apply(codes, 1)
+        self.size_runs.push(codes[1])
+        self.odd_even_runs.push(codes[2])
+        self.combo_runs.push(codes[3])
+
+    def remove(self, codes):
+        """移除窗口中最旧的一期"""
+        self._apply(codes, -1)
+        self.size_runs.pop()
+        self.odd_even_runs.pop()
+        self.combo_runs.pop()
+
+    def to_counters(self):
+        """导出原始计数和连续段（用于保存，恢复后可以继续累加）"""
+        return {
+            'total': self.total,
+            'basic': dict(self.basic),
+            'combos': dict(self.combos),
+            'sums': list(self.sums),
+            'patterns': dict(self.patterns),
+            'extremes': dict(self.extremes),
+            'size_runs': self.size_runs.to_list(),
+            'odd_even_runs': self.odd_even_runs.to_list(),
+            'combo_runs': self.combo_runs.to_list()
+        }
+
+    @classmethod
+    def from_counters(cls, counters):
+        """
+        由to_counters导出的数据恢复不限期数的统计
+
+        Args:
+            counters: 原始计数字典
+
+        Returns:
+            WindowStats实例
+        """
+        stats = cls()
+        stats.total = counters['total']
+        stats.basic.update(counters['basic'])
+        stats.combos.update(counters['combos'])
+        stats.sums = list(counters['sums'])
+        stats.patterns.update(counters['patterns'])
+        stats.extremes.update(counters['extremes'])
+        stats.size_runs = RunTracker.from_list(('big', 'small'), counters['size_runs'])
+        stats.odd_even_runs = RunTracker.from_list(('odd', 'even'), counters['odd_even_runs'])
+        stats.combo_runs = RunTracker.from_list(cls.COMBO_KEYS, counters['combo_runs'])
+        return stats
+
+    def to_payload(self):
+        """生成与 /api/stats 一致的统计结构"""
+        total = self.total
+        extreme_small = count_entry(self.extremes['extreme_small'], total)
+        extreme_big = count_entry(self.extremes['extreme_big'], total)
+        continuous = {}
+        continuous.update(self.size_runs.to_payload())
+        continuous.update(self.odd_even_runs.to_payload())
+        continuous.update(self.combo_runs.to_payload())
+        return {
+            'basic_types': {key: count_entry(count, total) for key, count in self.basic.items()},
+            'combination_types': {key: count_entry(count, total) for key, count in self.combos.items()},
+            'number_distribution': {f"{i:02d}": count_entry(count, total) for i, count in enumerate(self.sums)},
+            'pattern_types': {key: count_entry(count, total) for key, count in self.patterns.items()},
+            'extreme_types': {
+                'extreme_small': extreme_small,
+                'extreme_big': extreme_big,
+                'small_edge': dict(extreme_small),
+                'middle': count_entry(self.extremes['middle'], total),
+                'big_edge': dict(extreme_big)
+            },
+            'continuous_stats': continuous,
+            'total_periods': total
+        }
+
+# 和值对应的大小单双组合名称（与入库时按和值判断的大小单双一致）
+SUM_COMBO_NAMES = [
+    ('大' if number_sum > 13 else '小') + ('单' if number_sum % 2 == 1 else '双')
+    for number_sum in range(28)
+]
+
+def ranked_items(counts, last_seen, max_items=10):
+    """
+    按次数降序排列，次数相同时最近出现的排在前面
+
+    Args:
+        counts: {键: 次数}
+        last_seen: {键: 最近一次出现的序号}
+        max_items: 最多返回的条数
+
+    Returns:
+        [(键, 次数)] 列表
+    """
+    keys = [key for key, count in counts.items() if count > 0]
+    keys.sort(key=lambda key: (-counts[key], -last_seen[key]))
+    return [(key, counts[key]) for key in keys[:max_items]]
+
+class TransitionTables:
+    """
+    单个统计窗口的和值转移表
+
+    pairs[a, b] 为窗口内"和值a的下一期开出和值b"的次数，last_seen[a, b]
+    为最近一次出现该组合时后一期的序号；同时记录每个和值在窗口内的出现
+    序号和相邻出现间隔的分布。
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.pairs = np.zeros((28, 28), dtype=np.int32)
+        self.last_seen = np.full((28, 28), -1, dtype=np.int64)
+        self.positions = [deque() for _ in range(28)]
+        self.gaps = [{} for _ in range(28)]
+
+    @staticmethod
+    def _valid(number_sum):
+        return number_sum is not None and 0 <= number_sum <= 27
+
+    def add(self, seq, number_sum, previous_sum):
+        """
+        加入最新一期
+
+        Args:
+            seq: 该期的序号（逐期递增）
+            number_sum: 该期和值
+            previous_sum: 上一期和值，窗口内没有上一期时为None
+        """
+        if not self._valid(number_sum):
+            return
+        if self._valid(previous_sum):
+            self.pairs[previous_sum, number_sum] += 1
+            self.last_seen[previous_sum, number_sum] = seq
+        positions = self.positions[number_sum]
+        if positions:
+            gap = seq - positions[-1]
+            gaps = self.gaps[number_sum]
+            gaps[gap] = gaps.get(gap, 0) + 1
+        positions.append(seq)
+
+    def remove(self, seq, number_sum, next_sum):
+        """
+        移除窗口中最旧的一期
+
+        Args:
+            seq: 被移除一期的序号
+            number_sum: 被移除一期的和值
+            next_sum: 窗口内下一期的和值
+        """
+        if not self._valid(number_sum):
+            return
+        if self._valid(next_sum):
+            self.pairs[number_sum, next_sum] -= 1
+        positions = self.positions[number_sum]
+        positions.popleft()
+        if positions:
+            gap = positions[0] - seq
+            gaps = self.gaps[number_sum]
+            gaps[gap] -= 1
+            if not gaps[gap]:
+                del gaps[gap]
+
+    def analyze(self, number, total, newest_seq):
+        """
+        生成单个和值的号码分析结果（不含number字段）
+
+        Args:
+            number: 和值
+            total: 窗口内的期数
+            newest_seq: 最新一期的序号
+
+        Returns:
+            与 /api/number_analysis 一致的分析结构
+        """
+        valid = self._valid(number)
+        positions = self.positions[number] if valid else ()
+        occurrence_count = len(positions)
+        gaps = self.gaps[number] if valid else {}
+
+        before_numbers, after_numbers, after_tails, after_combos = [], [], [], []
+        if valid:
+            column = self.pairs[:, number]
+            column_seen = self.last_seen[:, number]
+            before_counts = {f"{i:02d}": int(column[i]) for i in range(28)}
+            before_seen = {f"{i:02d}": int(column_seen[i]) for i in range(28)}
+            before_numbers = [{'number': k, 'count': c} for k, c in ranked_items(before_counts, before_seen)]
+
+            row = self.pairs[number, :]
+            row_seen = self.last_seen[number, :]
+            after_counts = {f"{i:02d}": int(row[i]) for i in range(28)}
+            after_seen = {f"{i:02d}": int(row_seen[i]) for i in range(28)}
+            after_numbers = [{'number': k, 'count': c} for k, c in ranked_items(after_counts, after_seen)]
+
+            tail_counts, tail_seen, combo_counts, combo_seen = {}, {}, {}, {}
+            for i in range(28):
+                if not row[i]:
+                    continue
+                for counts, seen, key in ((tail_counts, tail_seen, str(i % 10)),
+                                          (combo_counts, combo_seen, SUM_COMBO_NAMES[i])):
+                    counts[key] = counts.get(key, 0) + int(row[i])
+                    seen[key] = max(seen.get(key, -1), int(row_seen[i]))
+            after_tails = [{'tail': k, 'count': c} for k, c in ranked_items(tail_counts, tail_seen)]
+            after_combos = [{'combo': k, 'count': c} for k, c in ranked_items(combo_counts, combo_seen)]
+
+        return {
+            'total_periods': total,
+            'occurrence_count': occurrence_count,
+            'avg_times': round(occurrence_count / (total / 100), 2) if total > 0 else 0,
+            'avg_interval': round(total / occurrence_count) if occurrence_count > 0 else total,
+            'not_opened_periods': newest_seq - positions[-1] if occurrence_count > 0 else total,
+            'min_interval': min(gaps) if gaps else 0,
+            'max_interval': max(gaps) if gaps else 0,
+            'before_numbers': before_numbers,
+            'after_numbers': after_numbers,
+            'after_tails': after_tails,
+            'after_combos': after_combos
+        }
+
+class StatsEngine:
+    """多个固定窗口的增量统计引擎"""
+
+    def __init__(self, windows):
+        """
+        Args:
+            windows: 统计窗口期数列表，例如 [50, 100, 200, 500, 1000]
+        """
+        self.windows = sorted(windows)
+        self.max_window = self.windows[-1]
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._draws = deque()  # 最新一期在最左侧
+        self._states = {size: WindowStats(size) for size in self.windows}
+        self._transitions = {size: TransitionTables(size) for size in self.windows}
+        self._seq = -1  # 最新一期的序号
+        self.head_qihao_num = None
+        self.is_loaded = False
+
+    def _push(self, record):
+        codes = draw_codes(record)
+        previous_sum = self._draws[0][0] if self._draws else None
+        self._seq += 1
+        self._draws.appendleft(codes)
+        for size, state in self._states.items():
+            state.add(codes)
+            transitions = self._transitions[size]
+            transitions.add(self._seq, codes[0], previous_sum if size > 1 else None)
+            # 加入新一期后，下标为size的一期离开窗口
+            if len(self._draws) > size:
+                removed = self._draws[size]
+                state.remove(removed)
+                transitions.remove(self._seq - size, removed[0], self._draws[size - 1][0] if size > 1 else None)
+        if len(self._draws) > self.max_window:
+            self._draws.pop()
+        self.head_qihao_num = record.qihao_num
+
+    def load(self, records):
+        """
+        使用最新的开奖记录重建所有窗口
+
+        Args:
+            records: 按期号降序排列的开奖记录列表
+        """
+        with self._lock:
+            self._reset()
+            for record in reversed(records[:self.max_window]):
+                self._push(record)
+            self.is_loaded = True
+        logger.info(f"统计引擎已加载 {min(len(records), self.max_window)} 期数据")
+
+    def add_draws(self, records):
+        """
+        加入新开奖记录
+
+        Args:
+            records: 新开奖记录列表（按期号降序）
+
+        Returns:
+            是否成功增量更新；记录不晚于当前最新一期时返回False，需要调用load重建
+        """
+        with self._lock:
+            if not self.is_loaded:
+                return False
+            ordered = sorted(records, key=lambda r: r.qihao_num)
+            if self.head_qihao_num is not None and ordered[0].qihao_num <= self.head_qihao_num:
+                return False
+            for record in ordered:
+                self._push(record)
+            return True
+
+    def get_stats(self, period):
+        """
+        获取指定窗口的统计结果
+
+        Args:
+            period: 统计期数
+
+        Returns:
+            统计结果字典，窗口不存在或未加载时返回None
+        """
+        with self._lock:
+            state = self._states.get(period)
+            if not self.is_loaded or state is None:
+                return None
+            return state.to_payload()
+
+    def get_number_analysis(self, period, number):
+        """
+        获取指定窗口中单个和值的号码分析结果
+
+        Args:
+            period: 统计期数
+            number: 和值
+
+        Returns:
+            分析结果字典（不含number字段），窗口不存在、未加载或无数据时返回None
+        """
+        with self._lock:
+            transitions = self._transitions.get(period)
+            if not self.is_loaded or transitions is None or not self._draws:
+                return None
+            total = min(period, len(self._draws))
+            return transitions.analyze(number, total, self._seq)
+
+    def get_all_number_analysis(self, period):
+        """
+        获取指定窗口中全部28个和值的号码分析结果
+
+        Args:
+            period: 统计期数
+
+        Returns:
+            按和值排列的分析结果列表（含number字段），不可用时返回None
+        """
+        with self._lock:
+            transitions = self._transitions.get(period)
+            if not self.is_loaded or transitions is None or not self._draws:
+                return None
+            total = min(period, len(self._draws))
+            results = []
+            for number in range(28):
+                analysis = transitions.analyze(number, total, self._seq)
+                analysis['number'] = f"{number:02d}"
+                results.append(analysis)
+            return results